@@ -0,0 +1,515 @@
+"""Open the audio streams of the test on a sound card or on virtual devices."""
+
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+import numpy as np
+from loguru import logger
+from scipy.io import wavfile
+
+from audio_processing.resample import resample
+
+
+class AudioStream(ABC):
+    """Interface of a running callback stream."""
+
+    @property
+    @abstractmethod
+    def latency(self) -> float:
+        """Latency of the stream in seconds.
+
+        Returns:
+            float: latency reported by the device.
+        """
+        ...
+
+    @abstractmethod
+    def start(self) -> None:
+        """Start calling the callback."""
+        ...
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stop calling the callback."""
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the device."""
+        ...
+
+
+class AudioBackend(ABC):
+    """Interface of the devices the stimuli are played and the responses captured on.
+
+    Output callbacks follow sounddevice (outdata, frames, time, status) and fill
+    a float32 (frames, 1) buffer. Input callbacks follow PyAudio (in_data,
+    frame_count, time_info, status) and receive 16 bit mono bytes.
+    """
+
+    @abstractmethod
+    def open_output(
+        self, sample_rate: int, block_size: int, latency: str, callback: Callable
+    ) -> AudioStream:
+        """Open a mono float32 output stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            block_size (int): frames requested by each callback.
+            latency (str): Latency setting of the device.
+            callback (Callable): Fills the device buffer.
+
+        Returns:
+            AudioStream: The stream, not started.
+        """
+        ...
+
+    @abstractmethod
+    def open_input(
+        self, sample_rate: int, chunk: int, callback: Callable
+    ) -> AudioStream:
+        """Open a mono 16 bit input stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            chunk (int): frames delivered by each callback.
+            callback (Callable): Receives the captured frames.
+
+        Returns:
+            AudioStream: The stream, not started.
+        """
+        ...
+
+    def close(self) -> None:  # noqa: B027
+        """Release the resources of the backend."""
+
+
+class _PyAudioInput(AudioStream):
+    """Input stream of the sound card through PyAudio."""
+
+    def __init__(self, sample_rate: int, chunk: int, callback: Callable) -> None:
+        """Open the stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            chunk (int): frames delivered by each callback.
+            callback (Callable): Receives the captured frames.
+        """
+        import pyaudio
+
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=sample_rate,
+            input=True,
+            frames_per_buffer=chunk,
+            stream_callback=callback,
+            start=False,
+        )
+
+    @property
+    def latency(self) -> float:
+        """Latency of the stream in seconds.
+
+        Returns:
+            float: input latency reported by the device.
+        """
+        return self._stream.get_input_latency()
+
+    def start(self) -> None:
+        """Start calling the callback."""
+        self._stream.start_stream()
+
+    def stop(self) -> None:
+        """Stop calling the callback."""
+        self._stream.stop_stream()
+
+    def close(self) -> None:
+        """Release the device."""
+        self._stream.close()
+        self._audio.terminate()
+
+
+class HardwareBackend(AudioBackend):
+    """Play through sounddevice and capture through PyAudio on the sound card."""
+
+    def open_output(
+        self, sample_rate: int, block_size: int, latency: str, callback: Callable
+    ) -> AudioStream:
+        """Open a mono float32 output stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            block_size (int): frames requested by each callback.
+            latency (str): Latency setting of the device.
+            callback (Callable): Fills the device buffer.
+
+        Returns:
+            AudioStream: The sounddevice stream, not started.
+        """
+        import sounddevice as sd
+
+        return sd.OutputStream(
+            samplerate=sample_rate,
+            channels=1,
+            dtype="float32",
+            blocksize=block_size,
+            latency=latency,
+            callback=callback,
+        )
+
+    def open_input(
+        self, sample_rate: int, chunk: int, callback: Callable
+    ) -> AudioStream:
+        """Open a mono 16 bit input stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            chunk (int): frames delivered by each callback.
+            callback (Callable): Receives the captured frames.
+
+        Returns:
+            AudioStream: The PyAudio stream, not started.
+        """
+        return _PyAudioInput(sample_rate, chunk, callback)
+
+
+class _VirtualStream(AudioStream):
+    """Call a stream callback from a thread at the pace of a sound card."""
+
+    def __init__(self, sample_rate: int, block_size: int, speed: float) -> None:
+        """Initialize the stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            block_size (int): frames per callback.
+            speed (float): pace relative to real time.
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self._period = block_size / sample_rate / speed
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def latency(self) -> float:
+        """Latency of the stream in seconds.
+
+        Returns:
+            float: duration of one block.
+        """
+        return self.block_size / self.sample_rate
+
+    def start(self) -> None:
+        """Start calling the callback."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop calling the callback."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        """Release the device."""
+        self.stop()
+
+    def _run(self) -> None:
+        """Call _tick once per block period until stopped."""
+        next_tick = time.perf_counter()
+        while self._running:
+            self._tick()
+            next_tick += self._period
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    @abstractmethod
+    def _tick(self) -> None:
+        """Exchange one block with the callback."""
+        ...
+
+
+class _VirtualOutput(_VirtualStream):
+    """Output stream storing what is played in its backend."""
+
+    def __init__(
+        self,
+        backend: "VirtualBackend",
+        sample_rate: int,
+        block_size: int,
+        callback: Callable,
+    ) -> None:
+        """Initialize the stream.
+
+        Args:
+            backend (VirtualBackend): backend storing the played samples.
+            sample_rate (int): sample per second.
+            block_size (int): frames requested by each callback.
+            callback (Callable): Fills the device buffer.
+        """
+        super().__init__(sample_rate, block_size, backend.speed)
+        self._backend = backend
+        self._callback = callback
+        self._status = SimpleNamespace(output_underflow=False)
+        self._active = False
+
+    def _tick(self) -> None:
+        """Get one block from the callback and hand it to the backend."""
+        outdata = np.zeros((self.block_size, 1), dtype=np.float32)
+        self._callback(outdata, self.block_size, None, self._status)
+        self._backend._store(outdata[:, 0], self.sample_rate)
+        if outdata.any():
+            self._active = True
+        elif self._active:
+            # A silent block after sound is the end of a playback.
+            self._active = False
+            self._backend._playback_ended()
+
+
+class _VirtualInput(_VirtualStream):
+    """Input stream answering each playback with a recorded response."""
+
+    def __init__(
+        self,
+        backend: "VirtualBackend",
+        sample_rate: int,
+        chunk: int,
+        callback: Callable,
+    ) -> None:
+        """Initialize the stream.
+
+        Args:
+            backend (VirtualBackend): backend providing the responses.
+            sample_rate (int): sample per second.
+            chunk (int): frames delivered by each callback.
+            callback (Callable): Receives the captured frames.
+        """
+        super().__init__(sample_rate, chunk, backend.speed)
+        self._backend = backend
+        self._callback = callback
+        self._answered = 0
+        self._response = np.zeros(0, dtype=np.int16)
+        self._rng = np.random.default_rng(backend.seed)
+        self._noise_scale = 32768 * 10 ** (backend.noise_level_db / 20)
+
+    def _tick(self) -> None:
+        """Send one chunk of background noise and response to the callback."""
+        if self._answered < self._backend.playbacks and self._backend.response_due():
+            self._answered = self._backend.playbacks
+            self._response = self._backend.next_response(self.sample_rate)
+        chunk = self._rng.normal(scale=self._noise_scale, size=self.block_size)
+        count = min(len(self._response), self.block_size)
+        # The participant speaks over the background noise of the room.
+        chunk[:count] += self._response[:count]
+        self._response = self._response[count:]
+        samples = np.clip(chunk, -32768, 32767).astype(np.int16)
+        self._callback(samples.tobytes(), self.block_size, None, 0)
+
+
+class VirtualBackend(AudioBackend):
+    """Loopback devices running the test without a sound card.
+
+    What is played is written to a 16 bit WAV file as it is played if an output
+    path is given, and its last keep_seconds are kept in memory. The input is a
+    low background noise, and once a playback ends and response_delay has
+    passed, the next recorded response of responses_dir is added to it, as a
+    participant answering the stimuli.
+    Streams run at speed times real time.
+    """
+
+    def __init__(
+        self,
+        responses_dir: Optional[str] = None,
+        output: Optional[str] = None,
+        speed: float = 1.0,
+        response_delay: float = 0.3,
+        noise_level_db: float = -60.0,
+        seed: int = 0,
+        keep_seconds: float = 10.0,
+    ) -> None:
+        """Initialize the backend and list the responses.
+
+        Args:
+            responses_dir (Optional[str]): Directory of the WAV files replayed as
+                responses, in name order and in a loop. Defaults to None, no
+                response is given.
+            output (Optional[str]): WAV file receiving what was played.
+                Defaults to None.
+            speed (float): Pace of the streams relative to real time.
+                Defaults to 1.0.
+            response_delay (float): Time between the end of a playback and the
+                response in seconds. Defaults to 0.3.
+            noise_level_db (float): Level of the input background noise in dBFS.
+                Defaults to -60.0.
+            seed (int): Seed of the background noise. Defaults to 0.
+            keep_seconds (float): Length of the played audio kept in memory in
+                seconds. Defaults to 10.0.
+        """
+        self.responses = []
+        if responses_dir:
+            self.responses = sorted(Path(responses_dir).glob("*.wav"))
+        self.output = output
+        self.speed = speed
+        self.response_delay = response_delay
+        self.noise_level_db = noise_level_db
+        self.seed = seed
+        self.playbacks = 0
+        self._ended_at = 0.0
+        self.keep_seconds = keep_seconds
+        self._next = 0
+        self._played: deque[np.ndarray] = deque()
+        self._kept = 0
+        self._output_rate: Optional[int] = None
+        self._output_file: Optional[wave.Wave_write] = None
+        self._output_lock = threading.Lock()
+
+    @property
+    def played(self) -> np.ndarray:
+        """Last keep_seconds played by the output streams.
+
+        Returns:
+            np.ndarray: float32 samples.
+        """
+        with self._output_lock:
+            if not self._played:
+                return np.zeros(0, dtype=np.float32)
+            return np.concatenate(self._played)
+
+    def open_output(
+        self, sample_rate: int, block_size: int, latency: str, callback: Callable
+    ) -> AudioStream:
+        """Open a mono float32 output stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            block_size (int): frames requested by each callback.
+            latency (str): Ignored, the latency is one block.
+            callback (Callable): Fills the device buffer.
+
+        Returns:
+            AudioStream: The virtual stream, not started.
+        """
+        with self._output_lock:
+            if self._output_rate is None:
+                self._output_rate = sample_rate
+                if self.output:
+                    self._output_file = wave.open(str(self.output), "wb")
+                    self._output_file.setnchannels(1)
+                    self._output_file.setsampwidth(2)
+                    self._output_file.setframerate(sample_rate)
+            elif sample_rate != self._output_rate:
+                logger.warning(
+                    f"Virtual output at {sample_rate} Hz is not kept, the output "
+                    f"is at {self._output_rate} Hz"
+                )
+        return _VirtualOutput(self, sample_rate, block_size, callback)
+
+    def open_input(
+        self, sample_rate: int, chunk: int, callback: Callable
+    ) -> AudioStream:
+        """Open a mono 16 bit input stream.
+
+        Args:
+            sample_rate (int): sample per second.
+            chunk (int): frames delivered by each callback.
+            callback (Callable): Receives the captured frames.
+
+        Returns:
+            AudioStream: The virtual stream, not started.
+        """
+        return _VirtualInput(self, sample_rate, chunk, callback)
+
+    def response_due(self) -> bool:
+        """Whether the response to the last playback should start.
+
+        Returns:
+            bool: True once response_delay has passed since the playback ended.
+        """
+        return time.perf_counter() - self._ended_at >= self.response_delay / self.speed
+
+    def next_response(self, sample_rate: int) -> np.ndarray:
+        """Load the next recorded response.
+
+        Args:
+            sample_rate (int): rate of the input stream.
+
+        Returns:
+            np.ndarray: 16 bit mono samples, empty if there are no responses.
+        """
+        if not self.responses:
+            return np.zeros(0, dtype=np.int16)
+        path = self.responses[self._next % len(self.responses)]
+        self._next += 1
+        file_rate, samples = wavfile.read(path)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        if np.issubdtype(samples.dtype, np.floating):
+            samples = samples * 32767
+        samples = resample(samples.astype(np.float32), file_rate, sample_rate)
+        logger.debug(f"Virtual response: {path}")
+        return np.clip(samples, -32768, 32767).astype(np.int16)
+
+    def close(self) -> None:
+        """Close the output file."""
+        with self._output_lock:
+            if self._output_file is not None:
+                self._output_file.close()
+                self._output_file = None
+                logger.debug(f"Virtual playback written to {self.output}")
+
+    def _store(self, block: np.ndarray, sample_rate: int) -> None:
+        """Keep a played block and write it to the output file.
+
+        Args:
+            block (np.ndarray): float32 samples.
+            sample_rate (int): rate of the output stream.
+        """
+        if sample_rate != self._output_rate:
+            return
+        with self._output_lock:
+            self._played.append(block.copy())
+            self._kept += len(block)
+            while self._kept - len(self._played[0]) >= self.keep_seconds * sample_rate:
+                self._kept -= len(self._played.popleft())
+            if self._output_file is not None:
+                samples = np.clip(block * 32768, -32768, 32767).astype("<i2")
+                self._output_file.writeframes(samples.tobytes())
+
+    def _playback_ended(self) -> None:
+        """Record the end of a playback, to be answered by the input."""
+        self._ended_at = time.perf_counter()
+        self.playbacks += 1
+
+
+_backend: Optional[AudioBackend] = None
+
+
+def get_backend() -> AudioBackend:
+    """Get the backend streams are opened on when none is given.
+
+    Returns:
+        AudioBackend: The backend set with set_backend, the sound card otherwise.
+    """
+    global _backend
+    if _backend is None:
+        _backend = HardwareBackend()
+    return _backend
+
+
+def set_backend(backend: AudioBackend) -> None:
+    """Set the backend streams are opened on when none is given.
+
+    Args:
+        backend (AudioBackend): The backend.
+    """
+    global _backend
+    _backend = backend
@@ -0,0 +1,105 @@
+"""Mix the stimuli with noise into preallocated buffers."""
+
+import numpy as np
+
+from audio_processing.noise import Noise
+
+
+class Mixer:
+    """Mix speech and noise in place into reusable float32 buffers.
+
+    The speech is surrounded by noise-only padding, and the start and end of the
+    mix are faded in and out. Buffers are used in turn, so the mix returned for
+    one trial stays valid while the next one is prepared.
+    """
+
+    def __init__(
+        self,
+        noise: Noise,
+        sample_rate: int,
+        max_duration: float = 5.0,
+        pre_padding: float = 0.227,
+        post_padding: float = 0.227,
+        fade: float = 0.01,
+        n_buffers: int = 2,
+    ) -> None:
+        """Allocate the buffers.
+
+        Args:
+            noise (Noise): object to generate noise.
+            sample_rate (int): sample rate of the speech and the output.
+            max_duration (float): Longest expected stimuli in seconds, buffers grow
+                if a longer one is mixed. Defaults to 5.0.
+            pre_padding (float): Noise before the speech in seconds.
+                Defaults to 0.227.
+            post_padding (float): Noise after the speech in seconds.
+                Defaults to 0.227.
+            fade (float): Length of the fade in and out ramps in seconds.
+                Defaults to 0.01.
+            n_buffers (int): Number of buffers used in turn. Defaults to 2.
+        """
+        self.noise = noise
+        self.sample_rate = sample_rate
+        self._pre = int(round(pre_padding * sample_rate))
+        self._post = int(round(post_padding * sample_rate))
+        fade_len = int(round(fade * sample_rate))
+        self._fade_in = (
+            np.sin(np.linspace(0, np.pi / 2, fade_len, dtype=np.float32)) ** 2
+        )
+        self._fade_out = self._fade_in[::-1].copy()
+        length = self._pre + int(max_duration * sample_rate) + self._post
+        self._buffers = [np.zeros(length, dtype=np.float32) for _ in range(n_buffers)]
+        self._next = 0
+
+    def mix(self, speech: np.ndarray, sample_rate: int, snr_db: float) -> np.ndarray:
+        """Mix the speech with noise at the given SNR.
+
+        Args:
+            speech (np.ndarray): clean speech of the stimuli.
+            sample_rate (int): sample rate of the speech.
+            snr_db (float): signal to noise ratio in db.
+
+        Raises:
+            ValueError: If the speech or the noise is at another sample rate.
+
+        Returns:
+            np.ndarray: view of the mix, valid until the buffer is used again.
+        """
+        if sample_rate != self.sample_rate:
+            raise ValueError(
+                f"Speech at {sample_rate} Hz cannot be mixed at {self.sample_rate} Hz"
+            )
+        if self.noise.sample_rate not in (None, self.sample_rate):
+            raise ValueError(
+                f"Noise at {self.noise.sample_rate} Hz cannot be mixed with speech "
+                f"at {self.sample_rate} Hz"
+            )
+
+        total = self._pre + len(speech) + self._post
+        output = self._get_buffer(total)
+        output[: self._pre] = 0
+        output[self._pre : self._pre + len(speech)] = speech
+        output[self._pre + len(speech) :] = 0
+
+        # The noise is measured against the padded speech, as before the mixer.
+        output += self.noise.generate_noise(output, snr_db)
+
+        fade_len = min(len(self._fade_in), total // 2)
+        output[:fade_len] *= self._fade_in[:fade_len]
+        output[total - fade_len :] *= self._fade_out[len(self._fade_out) - fade_len :]
+        return output
+
+    def _get_buffer(self, length: int) -> np.ndarray:
+        """Get the next buffer in turn, growing it if it is too short.
+
+        Args:
+            length (int): number of samples needed.
+
+        Returns:
+            np.ndarray: view of the buffer with the requested length.
+        """
+        index = self._next
+        self._next = (self._next + 1) % len(self._buffers)
+        if len(self._buffers[index]) < length:
+            self._buffers[index] = np.zeros(length, dtype=np.float32)
+        return self._buffers[index][:length]
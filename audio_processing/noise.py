@@ -1,21 +1,34 @@
 """Class to generate and process the noise signal."""
 
-import random
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
 
 import numpy as np
+from loguru import logger
 from scipy.io import wavfile
+from scipy.signal import firwin2, oaconvolve, welch
 
+from audio_processing.noise_pool import NoisePool, new_seed
+from audio_processing.noise_reader import open_reader, streamed_rms_amplitude
+from audio_processing.resample import resample
 from audio_processing.util import (
-    calculate_db_spl,
-    convert_to_specific_db_spl,
+    chunked_rms_amplitude,
+    db_spl_to_rms,
     rms_amplitude,
 )
+from vocalizer.cache import fingerprint
+from vocalizer.vocalizer import Vocalizer
 
 
 class Noise(ABC):
     """Abstract class for noise generation."""
 
+    # Sample rate of the generated noise, None if it suits any rate.
+    sample_rate: Optional[int] = None
+
     @abstractmethod
     def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
         """Interface for generating noise.
@@ -30,6 +43,37 @@ class Noise(ABC):
         """
         ...
 
+    def mix_snrs(self, signal: np.ndarray, snrs_db: np.ndarray) -> np.ndarray:
+        """Mix a signal with the same noise at many SNRs at once.
+
+        The noise is generated and measured once, at 0 dB, and scaled to every SNR
+        by broadcasting.
+
+        Args:
+            signal (np.ndarray): numpy array containing the signal.
+            snrs_db (np.ndarray): desired SNRs of the noise relative to the signal
+                in dB.
+
+        Returns:
+            np.ndarray: float32 mixes, one row per SNR.
+        """
+        noise = np.asarray(self.generate_noise(signal, 0), dtype=np.float32)
+        gains = self._snr_gains(np.asarray(snrs_db, dtype=np.float32))
+        mixes = np.multiply.outer(gains, noise)
+        mixes += np.asarray(signal, dtype=np.float32)
+        return mixes
+
+    def _snr_gains(self, snrs_db: np.ndarray) -> np.ndarray:
+        """Get the gain turning the noise generated at 0 dB into noise at each SNR.
+
+        Args:
+            snrs_db (np.ndarray): SNRs in dB.
+
+        Returns:
+            np.ndarray: gain of the noise for each SNR.
+        """
+        return 10 ** (-snrs_db / 20)
+
     def _get_noise_amplitude(self, signal: np.ndarray, desired_snr_db: float) -> float:
         """Measure the required amplitude of the noise to achieve the desired SNR.
 
@@ -51,7 +95,24 @@ class Noise(ABC):
 
 
 class WhiteNoise(Noise):
-    """A class for generating random gaussian noise with specific db."""
+    """A class for generating random gaussian noise with specific db.
+
+    The noise is served from a seeded NoisePool, and the seed, buffer and offset
+    of each trial are logged so the noise can be replayed.
+    """
+
+    def __init__(
+        self, seed: Optional[int] = None, pool_size: int = 2**22, refill: bool = True
+    ) -> None:
+        """Initialize the class and draw the noise pool.
+
+        Args:
+            seed (Optional[int]): Seed of the noise. Defaults to None, a fresh seed.
+            pool_size (int): Number of samples drawn at once. Defaults to 2**22.
+            refill (bool): Draw new noise when the pool is used up instead of
+                reusing it. Defaults to True.
+        """
+        self._pool = NoisePool(seed=seed, size=pool_size, refill=refill)
 
     def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
         """Generate a random gaussian noise signal with a specific SNR.
@@ -65,21 +126,58 @@ class WhiteNoise(Noise):
             np.ndarray: numpy array containing the noise signal.
         """
         noise_amplitude = self._get_noise_amplitude(signal, desired_snr_db)
-        noise = np.random.normal(scale=noise_amplitude, size=len(signal))
+        window, generation, offset = self._pool.take(len(signal))
+        logger.debug(
+            f"White noise: seed {self._pool.seed}, buffer {generation}, "
+            f"offset {offset}, length {len(signal)}"
+        )
+        return window * np.float32(noise_amplitude)
 
-        return noise
+    def _snr_gains(self, snrs_db: np.ndarray) -> np.ndarray:
+        """Get the gain turning the noise generated at 0 dB into noise at each SNR.
+
+        Follows _get_noise_amplitude, where the amplitude is divided by
+        sqrt(10 ** (snr / 20)).
+
+        Args:
+            snrs_db (np.ndarray): SNRs in dB.
+
+        Returns:
+            np.ndarray: gain of the noise for each SNR.
+        """
+        return 10 ** (-snrs_db / 40)
 
 
 class Babble(Noise):
-    """A class for generating babble noise from w wave file."""
+    """A class for generating babble noise from w wave file.
+
+    The file is memory-mapped and its RMS is measured once, so each trial only
+    reads and scales a window as long as the signal.
+    """
 
-    def __init__(self, noise_src: str) -> None:
-        """Initialize the class and load the noise file.
+    sample_rate: int
+
+    def __init__(
+        self,
+        noise_src: str,
+        sample_rate: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize the class, map the noise file and measure its level.
 
         Args:
             noise_src (str): path of the wave file containing the noise.
+            sample_rate (Optional[int]): Rate of the signals the noise is mixed with,
+                each window is resampled to it. Defaults to None, the file rate.
+            seed (Optional[int]): Seed of the window offsets. Defaults to None,
+                a fresh seed.
         """
-        self._sample_rate, self._noise = wavfile.read(noise_src)
+        self.seed = new_seed() if seed is None else seed
+        self._rng = np.random.default_rng(self.seed)
+        logger.debug(f"Babble noise seed: {self.seed}")
+        self._file_rate, self._noise = wavfile.read(noise_src, mmap=True)
+        self.sample_rate = sample_rate or self._file_rate
+        self._noise_rms = chunked_rms_amplitude(self._noise)
 
     def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
         """Generate a babble noise signal.
@@ -97,7 +195,409 @@ class Babble(Noise):
         """
         signal_db = 65
         noise_db = signal_db - desired_snr_db
-        scaled_noise = convert_to_specific_db_spl(self._noise, noise_db)
-        signal_len = len(signal)
-        noise_start_point = random.randint(0, len(scaled_noise) - signal_len)
-        return scaled_noise[noise_start_point : noise_start_point + signal_len]
+        factor = db_spl_to_rms(noise_db) / self._noise_rms
+        window = self._read_window(len(signal))
+        window *= np.float32(factor)
+        return window
+
+    def _read_window(self, length: int) -> np.ndarray:
+        """Read a random window of the noise file at the output sample rate.
+
+        Args:
+            length (int): number of samples at the output rate.
+
+        Returns:
+            np.ndarray: float32 copy of the window.
+        """
+        # Read a few extra samples so the resampled window is long enough.
+        file_len = int(np.ceil(length * self._file_rate / self.sample_rate))
+        if self._file_rate != self.sample_rate:
+            file_len += 1
+        noise_start_point = int(self._rng.integers(0, len(self._noise) - file_len + 1))
+        logger.debug(f"Babble noise: seed {self.seed}, offset {noise_start_point}")
+        window = self._noise[noise_start_point : noise_start_point + file_len]
+        window = resample(window.astype(np.float32), self._file_rate, self.sample_rate)
+        return window[:length]
+
+
+@lru_cache(maxsize=4)
+def _load_talkers(
+    talkers_dir: str, sample_rate: Optional[int]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Decode the recordings of a talker directory once.
+
+    Each recording is converted to float32, resampled and normalized to unit RMS,
+    and all of them are concatenated so windows of many talkers can be gathered
+    with one indexing operation.
+
+    Args:
+        talkers_dir (str): directory containing one wave file per talker.
+        sample_rate (Optional[int]): rate to resample the recordings to. None keeps
+            the rate of the files.
+
+    Raises:
+        FileNotFoundError: If the directory does not contain any wave file.
+        ValueError: If the files are at different rates and no rate is given.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, int]: the concatenated samples,
+            the start and length of each talker in them, and their sample rate.
+    """
+    files = sorted(Path(talkers_dir).glob("*.wav"))
+    if not files:
+        raise FileNotFoundError(f"No talker recordings found in {talkers_dir}")
+
+    talkers = []
+    rates = set()
+    for file in files:
+        file_rate, samples = wavfile.read(file)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        rates.add(file_rate)
+        samples = resample(
+            samples.astype(np.float32), file_rate, sample_rate or file_rate
+        )
+        talkers.append(samples / np.float32(rms_amplitude(samples)))
+    if sample_rate is None and len(rates) > 1:
+        raise ValueError(f"Talker recordings at mixed sample rates: {sorted(rates)}")
+
+    lengths = np.array([len(talker) for talker in talkers])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    logger.debug(f"Loaded {len(talkers)} talkers from {talkers_dir}")
+    return np.concatenate(talkers), starts, lengths, sample_rate or rates.pop()
+
+
+class MultiTalkerBabble(Noise):
+    """A class for synthesizing babble noise from individual talker recordings.
+
+    Each trial sums randomly offset windows of n_talkers different talkers,
+    each normalized to the same level, so the number of talkers can be changed
+    without rendering a babble file for it. The decoded talkers are shared by
+    all instances using the same directory and rate.
+    """
+
+    sample_rate: int
+
+    def __init__(
+        self,
+        talkers_dir: str,
+        n_talkers: int = 4,
+        sample_rate: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize the class and decode the talker recordings.
+
+        Args:
+            talkers_dir (str): directory containing one wave file per talker.
+            n_talkers (int): Number of talkers heard at once. Defaults to 4.
+            sample_rate (Optional[int]): Rate of the signals the noise is mixed with.
+                Defaults to None, the rate of the recordings.
+            seed (Optional[int]): Seed of the talker and offset choices. Defaults
+                to None, a fresh seed.
+
+        Raises:
+            ValueError: If n_talkers is not positive.
+        """
+        if n_talkers < 1:
+            raise ValueError(f"Babble needs at least one talker, got {n_talkers}")
+        self.n_talkers = n_talkers
+        self.seed = new_seed() if seed is None else seed
+        self._rng = np.random.default_rng(self.seed)
+        logger.debug(f"Multi-talker babble seed: {self.seed}")
+        self._samples, self._starts, self._lengths, self.sample_rate = _load_talkers(
+            str(talkers_dir), sample_rate
+        )
+
+    def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
+        """Synthesize a babble noise signal.
+
+        The level follows the Babble convention: the speech is taken to be at
+        65 dB SPL and the babble is scaled to 65 dB SPL minus the SNR.
+
+        Args:
+            signal (np.ndarray): numpy array containing the signal.
+            desired_snr_db (float): desired SNR of the noise relative
+                                            to the signal in dB.
+
+        Returns:
+            np.ndarray: numpy array containing the noise signal.
+        """
+        babble = self._synthesize(len(signal))
+        signal_db = 65
+        noise_db = signal_db - desired_snr_db
+        babble *= np.float32(db_spl_to_rms(noise_db) / rms_amplitude(babble))
+        return babble
+
+    def _synthesize(self, length: int) -> np.ndarray:
+        """Sum random windows of n_talkers talkers.
+
+        Talkers are drawn without replacement while there are enough of them, and
+        recordings shorter than the window are looped.
+
+        Args:
+            length (int): number of samples.
+
+        Returns:
+            np.ndarray: float32 sum of the windows.
+        """
+        n_available = len(self._starts)
+        talkers = self._rng.choice(
+            n_available, self.n_talkers, replace=self.n_talkers > n_available
+        )
+        lengths = self._lengths[talkers]
+        offsets = self._rng.integers(0, lengths)
+        logger.debug(
+            f"Multi-talker babble: seed {self.seed}, talkers {talkers.tolist()}, "
+            f"offsets {offsets.tolist()}"
+        )
+        positions = (offsets[:, None] + np.arange(length)) % lengths[:, None]
+        return self._samples[self._starts[talkers, None] + positions].sum(axis=0)
+
+
+class SpeechShapedNoise(Noise):
+    """A class for generating stationary noise with the spectrum of the stimuli.
+
+    The long-term average spectrum of the stimuli and the FIR filter matching it
+    are computed once per vocalizer state and cached on disk. A long buffer of
+    seeded white noise is filtered once, and each trial reads a window of it.
+    """
+
+    sample_rate: int
+
+    def __init__(
+        self,
+        vocalizer: Vocalizer,
+        texts: list[str],
+        sample_rate: int,
+        cache_dir: str = "models/noise_cache",
+        n_fft: int = 1024,
+        n_taps: int = 1025,
+        duration: float = 30.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize the class, get the filter and generate the noise buffer.
+
+        Args:
+            vocalizer (Vocalizer): object generating the stimuli of the test.
+            texts (list[str]): stimuli the spectrum is averaged over.
+            sample_rate (int): Rate of the signals the noise is mixed with.
+            cache_dir (str): Directory of the cached filters.
+                Defaults to "models/noise_cache".
+            n_fft (int): Length of the segments the spectrum is measured on.
+                Defaults to 1024.
+            n_taps (int): Length of the filter, odd. Defaults to 1025.
+            duration (float): Length of the noise buffer in seconds.
+                Defaults to 30.0.
+            seed (Optional[int]): Seed of the noise and the window offsets.
+                Defaults to None, a fresh seed.
+        """
+        self.sample_rate = sample_rate
+        self.seed = new_seed() if seed is None else seed
+        self._rng = np.random.default_rng(self.seed)
+        logger.debug(f"Speech-shaped noise seed: {self.seed}")
+
+        settings = {
+            "vocalizer": vocalizer.settings,
+            "texts": texts,
+            "sample_rate": sample_rate,
+            "n_fft": n_fft,
+            "n_taps": n_taps,
+        }
+        cache_path = Path(cache_dir) / (
+            f"ltas-{fingerprint(vocalizer.sources, settings)}.npz"
+        )
+        if cache_path.exists():
+            self._taps = np.load(cache_path)["taps"]
+        else:
+            freqs, psd = self._speech_spectrum(vocalizer, texts, n_fft)
+            self._taps = self._design_filter(freqs, psd, n_fft, n_taps)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_path, freqs=freqs, psd=psd, taps=self._taps)
+            logger.debug(f"Speech spectrum cached in {cache_path}")
+
+        white = self._rng.standard_normal(
+            int(duration * sample_rate) + len(self._taps) - 1, dtype=np.float32
+        )
+        buffer = oaconvolve(white, self._taps.astype(np.float32), mode="valid")
+        buffer /= np.float32(rms_amplitude(buffer))
+        buffer.setflags(write=False)
+        self._buffer = buffer
+
+    def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
+        """Generate a speech-shaped noise signal.
+
+        The level follows the Babble convention: the speech is taken to be at
+        65 dB SPL and the noise is scaled to 65 dB SPL minus the SNR.
+
+        Args:
+            signal (np.ndarray): numpy array containing the signal.
+            desired_snr_db (float): desired SNR of the noise relative
+                                            to the signal in dB.
+
+        Returns:
+            np.ndarray: numpy array containing the noise signal.
+        """
+        offset = int(self._rng.integers(0, len(self._buffer)))
+        logger.debug(f"Speech-shaped noise: seed {self.seed}, offset {offset}")
+        window = np.take(
+            self._buffer, np.arange(offset, offset + len(signal)), mode="wrap"
+        )
+        signal_db = 65
+        window *= np.float32(db_spl_to_rms(signal_db - desired_snr_db))
+        return window
+
+    def _speech_spectrum(
+        self, vocalizer: Vocalizer, texts: list[str], n_fft: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Measure the long-term average spectrum of the stimuli.
+
+        Args:
+            vocalizer (Vocalizer): object generating the stimuli.
+            texts (list[str]): stimuli to average over.
+            n_fft (int): Length of the segments of the Welch estimate.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: frequencies and power spectral density,
+                each stimuli weighted by its length.
+        """
+        psd_sum = np.zeros(n_fft // 2 + 1)
+        total = 0
+        for text in texts:
+            sound = np.asarray(vocalizer.get_sound(text), dtype=np.float32)
+            freqs, psd = welch(sound, fs=vocalizer.sample_rate, nperseg=n_fft)
+            psd_sum = psd_sum + psd * len(sound)
+            total += len(sound)
+        return freqs, psd_sum / total
+
+    def _design_filter(
+        self, freqs: np.ndarray, psd: np.ndarray, n_fft: int, n_taps: int
+    ) -> np.ndarray:
+        """Design a linear-phase filter whose gain follows the spectrum.
+
+        The spectrum is interpolated on the frequencies of the output rate, with no
+        gain above the band of the stimuli.
+
+        Args:
+            freqs (np.ndarray): frequencies of the spectrum.
+            psd (np.ndarray): power spectral density of the stimuli.
+            n_fft (int): number of points of the gain grid.
+            n_taps (int): length of the filter.
+
+        Returns:
+            np.ndarray: filter coefficients.
+        """
+        grid = np.linspace(0, self.sample_rate / 2, n_fft // 2 + 1)
+        gain = np.sqrt(np.interp(grid, freqs, psd, right=0))
+        return firwin2(n_taps, grid, gain / gain.max(), fs=self.sample_rate)
+
+
+class StreamedBabble(Noise):
+    """A class for generating babble noise from long recordings.
+
+    Windows are decoded from the file on demand by seeking, so memory does not
+    depend on the length of the recording, which can be a WAV or a FLAC file.
+    The offset of the next window is drawn in advance and the window is decoded
+    from it in the background while the current trial plays. Its length is the
+    longest window requested so far, starting from read_ahead seconds. The level
+    of the file is measured once and cached on disk under its path, size and
+    modification time.
+    """
+
+    sample_rate: int
+
+    def __init__(
+        self,
+        noise_src: str,
+        sample_rate: Optional[int] = None,
+        seed: Optional[int] = None,
+        read_ahead: float = 3.0,
+        cache_dir: str = "models/noise_cache",
+    ) -> None:
+        """Initialize the class, open the noise file and measure its level.
+
+        Args:
+            noise_src (str): path of the file containing the noise.
+            sample_rate (Optional[int]): Rate of the signals the noise is mixed with,
+                each window is resampled to it. Defaults to None, the file rate.
+            seed (Optional[int]): Seed of the window offsets. Defaults to None,
+                a fresh seed.
+            read_ahead (float): Length of the first window decoded in advance in
+                seconds, longer windows are decoded when requested.
+                Defaults to 3.0.
+            cache_dir (str): Directory of the cached levels.
+                Defaults to "models/noise_cache".
+        """
+        self.seed = new_seed() if seed is None else seed
+        self._rng = np.random.default_rng(self.seed)
+        logger.debug(f"Streamed babble noise seed: {self.seed}")
+        self._reader = open_reader(noise_src)
+        self._file_rate = self._reader.sample_rate
+        self.sample_rate = sample_rate or self._file_rate
+        cache_path = Path(cache_dir) / f"rms-{fingerprint([Path(noise_src)])}.npz"
+        if cache_path.exists():
+            self._noise_rms = float(np.load(cache_path)["rms"])
+        else:
+            self._noise_rms = streamed_rms_amplitude(self._reader)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_path, rms=self._noise_rms)
+            logger.debug(f"Level of {noise_src} cached in {cache_path}")
+        self._block = min(int(read_ahead * self._file_rate), self._reader.n_frames)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = self._read_ahead()
+
+    def generate_noise(self, signal: np.ndarray, desired_snr_db: float) -> np.ndarray:
+        """Generate a babble noise signal.
+
+        Args:
+            signal (np.ndarray): numpy array containing the signal.
+            desired_snr_db (float): desired SNR of the noise relative
+                                            to the signal in dB.
+
+        Returns:
+            np.ndarray: numpy array containing the noise signal.
+        """
+        signal_db = 65
+        noise_db = signal_db - desired_snr_db
+        factor = db_spl_to_rms(noise_db) / self._noise_rms
+        window = self._read_window(len(signal))
+        window *= np.float32(factor)
+        return window
+
+    def close(self) -> None:
+        """Stop the read-ahead and release the file."""
+        self._executor.shutdown(wait=True)
+        self._reader.close()
+
+    def _read_window(self, length: int) -> np.ndarray:
+        """Get a random window of the noise file at the output sample rate.
+
+        Args:
+            length (int): number of samples at the output rate.
+
+        Returns:
+            np.ndarray: float32 window.
+        """
+        file_len = int(np.ceil(length * self._file_rate / self.sample_rate))
+        if self._file_rate != self.sample_rate:
+            file_len += 1
+
+        offset, block = self._pending[0], self._pending[1].result()
+        if len(block) >= file_len:
+            window = block[:file_len]
+        else:
+            offset = int(self._rng.integers(0, self._reader.n_frames - file_len + 1))
+            window = self._reader.read(offset, file_len)
+            # Trials have similar lengths, decode the next one at this length.
+            self._block = min(file_len, self._reader.n_frames)
+        logger.debug(f"Streamed babble noise: seed {self.seed}, offset {offset}")
+        self._pending = self._read_ahead()
+        return resample(window, self._file_rate, self.sample_rate)[:length]
+
+    def _read_ahead(self) -> tuple[int, Future]:
+        """Draw the offset of the next window and decode it in the background.
+
+        Returns:
+            tuple[int, Future]: offset of the window, and the future of its samples.
+        """
+        offset = int(self._rng.integers(0, self._reader.n_frames - self._block + 1))
+        return offset, self._executor.submit(self._reader.read, offset, self._block)
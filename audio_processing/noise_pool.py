@@ -0,0 +1,138 @@
+"""Serve windows of pre-generated, reproducible gaussian noise."""
+
+import threading
+from typing import Optional, cast
+
+import numpy as np
+from loguru import logger
+
+
+def new_seed() -> int:
+    """Draw a fresh seed from the operating system.
+
+    Returns:
+        int: seed to log and pass to numpy.random.default_rng.
+    """
+    # The entropy of a SeedSequence created without one is a fresh int.
+    return cast(int, np.random.SeedSequence().entropy)
+
+
+class NoisePool:
+    """Hand out windows of a large float32 gaussian noise buffer.
+
+    Buffers are drawn in sequence from one seeded numpy.random.Generator, so a
+    window is identified by the seed, the number of the buffer and the offset in
+    it, and can be generated again bit-exactly with NoisePool.replay. When a
+    buffer is used up, the pool either starts over on the same buffer ("ring") or
+    moves to the next buffer of the sequence ("refill"), optionally drawn ahead
+    of time in a background thread.
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        size: int = 2**22,
+        refill: bool = True,
+        background: bool = True,
+    ) -> None:
+        """Draw the first buffer.
+
+        Args:
+            seed (Optional[int]): Seed of the generator. Defaults to None, a fresh
+                seed is drawn and logged.
+            size (int): Number of samples per buffer. Defaults to 2**22.
+            refill (bool): Draw a new buffer when one is used up instead of reusing
+                it. Defaults to True.
+            background (bool): Draw the next buffer in a background thread.
+                Defaults to True.
+        """
+        self.seed = new_seed() if seed is None else seed
+        self.size = size
+        self.refill = refill
+        self.background = background and refill
+        self._rng = np.random.default_rng(self.seed)
+        self._buffer = self._draw()
+        self.generation = 0
+        self._position = 0
+        self._next_buffer: Optional[np.ndarray] = None
+        self._refill_thread: Optional[threading.Thread] = None
+        logger.debug(f"Noise pool seed: {self.seed}")
+
+    @classmethod
+    def replay(
+        cls, seed: int, generation: int, offset: int, length: int, size: int = 2**22
+    ) -> np.ndarray:
+        """Generate a window served by a pool again.
+
+        Args:
+            seed (int): Seed of the pool.
+            generation (int): Number of the buffer the window was taken from.
+            offset (int): Start of the window in the buffer.
+            length (int): Length of the window.
+            size (int): Buffer size of the pool. Defaults to 2**22.
+
+        Returns:
+            np.ndarray: The same samples the pool served.
+        """
+        rng = np.random.default_rng(seed)
+        for _ in range(generation):
+            rng.standard_normal(size, dtype=np.float32)
+        return rng.standard_normal(size, dtype=np.float32)[offset : offset + length]
+
+    def take(self, length: int) -> tuple[np.ndarray, int, int]:
+        """Get the next window of unit-variance noise.
+
+        Args:
+            length (int): Number of samples.
+
+        Raises:
+            ValueError: If the window is longer than a buffer.
+
+        Returns:
+            tuple[np.ndarray, int, int]: read-only view of the noise, and the buffer
+                number and offset identifying it.
+        """
+        if length > self.size:
+            raise ValueError(f"Cannot take {length} samples from a pool of {self.size}")
+        if self._position + length > self.size:
+            self._advance()
+        offset = self._position
+        self._position += length
+        if self.background and self._position > self.size // 2:
+            self._start_refill()
+        window = self._buffer[offset : offset + length]
+        return window, self.generation, offset
+
+    def _advance(self) -> None:
+        """Move to the start of the next buffer, or of the same one in ring mode."""
+        self._position = 0
+        if not self.refill:
+            return
+        if self._refill_thread is not None:
+            self._refill_thread.join()
+            self._refill_thread = None
+        if self._next_buffer is None:
+            self._next_buffer = self._draw()
+        self._buffer, self._next_buffer = self._next_buffer, None
+        self.generation += 1
+
+    def _start_refill(self) -> None:
+        """Draw the next buffer in a background thread if not done yet."""
+        if self._next_buffer is not None or self._refill_thread is not None:
+            return
+        self._refill_thread = threading.Thread(target=self._refill, daemon=True)
+        self._refill_thread.start()
+
+    def _refill(self) -> None:
+        """Draw the next buffer."""
+        self._next_buffer = self._draw()
+
+    def _draw(self) -> np.ndarray:
+        """Draw one buffer from the generator.
+
+        Returns:
+            np.ndarray: read-only float32 noise.
+        """
+        buffer = self._rng.standard_normal(self.size, dtype=np.float32)
+        buffer.setflags(write=False)
+        return buffer
@@ -0,0 +1,162 @@
+"""Read windows of long noise recordings without loading them in memory."""
+
+import threading
+import wave
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# Types of the PCM samples of a wave file, by sample width in bytes.
+_PCM_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+class NoiseReader(ABC):
+    """Abstract class for seeking readers of noise files.
+
+    Readers decode only the requested frames and return them as mono float32, in
+    the integer scale of the file so levels match the other noise classes.
+    """
+
+    sample_rate: int
+    n_frames: int
+
+    @abstractmethod
+    def read(self, start: int, n_frames: int) -> np.ndarray:
+        """Decode consecutive frames of the file.
+
+        Args:
+            start (int): index of the first frame.
+            n_frames (int): number of frames, fewer are returned at the end.
+
+        Returns:
+            np.ndarray: mono float32 samples.
+        """
+        ...
+
+    def close(self) -> None:  # noqa: B027
+        """Release the file."""
+
+
+class WavReader(NoiseReader):
+    """Read PCM wave files with the wave module."""
+
+    def __init__(self, src: str) -> None:
+        """Open the file and read its header.
+
+        Args:
+            src (str): path of the wave file.
+
+        Raises:
+            ValueError: If the sample width is not supported.
+        """
+        self._file = wave.open(str(src), "rb")
+        self._width = self._file.getsampwidth()
+        if self._width not in (*_PCM_TYPES, 3):
+            self._file.close()
+            raise ValueError(f"Unsupported sample width: {self._width} bytes")
+        self._channels = self._file.getnchannels()
+        self.sample_rate = self._file.getframerate()
+        self.n_frames = self._file.getnframes()
+        self._lock = threading.Lock()
+
+    def read(self, start: int, n_frames: int) -> np.ndarray:
+        """Decode consecutive frames of the file.
+
+        Args:
+            start (int): index of the first frame.
+            n_frames (int): number of frames, fewer are returned at the end.
+
+        Returns:
+            np.ndarray: mono float32 samples.
+        """
+        with self._lock:
+            self._file.setpos(start)
+            data = self._file.readframes(n_frames)
+
+        if self._width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+            padded = np.zeros((len(raw), 4), dtype=np.uint8)
+            padded[:, 1:] = raw
+            samples = padded.view("<i4")[:, 0] >> 8
+        else:
+            samples = np.frombuffer(data, dtype=_PCM_TYPES[self._width])
+        samples = samples.astype(np.float32)
+        if self._width == 1:
+            samples -= 128
+        if self._channels > 1:
+            samples = samples.reshape(-1, self._channels).mean(axis=1)
+        return samples
+
+    def close(self) -> None:
+        """Release the file."""
+        self._file.close()
+
+
+class TorchaudioReader(NoiseReader):
+    """Read compressed files (e.g. FLAC) or other wave formats with torchaudio."""
+
+    def __init__(self, src: str) -> None:
+        """Read the header of the file.
+
+        Args:
+            src (str): path of the file.
+        """
+        import torchaudio
+
+        self._torchaudio = torchaudio
+        self._src = str(src)
+        info = torchaudio.info(self._src)
+        self.sample_rate = info.sample_rate
+        self.n_frames = info.num_frames
+        self._scale = 2 ** (info.bits_per_sample - 1) if info.bits_per_sample else 1
+
+    def read(self, start: int, n_frames: int) -> np.ndarray:
+        """Decode consecutive frames of the file.
+
+        Args:
+            start (int): index of the first frame.
+            n_frames (int): number of frames, fewer are returned at the end.
+
+        Returns:
+            np.ndarray: mono float32 samples.
+        """
+        waveform, _ = self._torchaudio.load(
+            self._src, frame_offset=start, num_frames=n_frames
+        )
+        return (waveform.mean(dim=0).numpy() * self._scale).astype(np.float32)
+
+
+def open_reader(src: str) -> NoiseReader:
+    """Open a seeking reader suited to a noise file.
+
+    Args:
+        src (str): path of the file.
+
+    Returns:
+        NoiseReader: a WavReader for PCM wave files, a TorchaudioReader otherwise.
+    """
+    if Path(src).suffix.lower() == ".wav":
+        try:
+            return WavReader(src)
+        except (wave.Error, ValueError) as exc:
+            logger.debug(f"Reading {src} with torchaudio: {exc}")
+    return TorchaudioReader(src)
+
+
+def streamed_rms_amplitude(reader: NoiseReader, chunk_frames: int = 2**20) -> float:
+    """Calculate the RMS amplitude of a whole file one chunk at a time.
+
+    Args:
+        reader (NoiseReader): reader of the file.
+        chunk_frames (int): Number of frames per chunk. Defaults to 2**20.
+
+    Returns:
+        float: float containing the RMS amplitude of the file.
+    """
+    sum_squares = 0.0
+    for start in range(0, reader.n_frames, chunk_frames):
+        chunk = reader.read(start, chunk_frames).astype(np.float64)
+        sum_squares += float(np.dot(chunk, chunk))
+    return np.sqrt(sum_squares / reader.n_frames)
@@ -0,0 +1,51 @@
+"""Convert signals between sample rates with cached polyphase filters."""
+
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+
+@lru_cache(maxsize=None)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """Design the anti-aliasing filter of a rate conversion once.
+
+    The filter is the one scipy.signal.resample_poly designs by default, a
+    Kaiser-windowed sinc with 10 zero crossings per side of the slower rate.
+
+    Args:
+        up (int): Upsampling factor.
+        down (int): Downsampling factor.
+
+    Returns:
+        np.ndarray: Read-only FIR coefficients.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+    taps.setflags(write=False)
+    return taps
+
+
+def resample(signal: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """Resample a signal, keeping its type.
+
+    Args:
+        signal (np.ndarray): input signal.
+        orig_rate (int): sample rate of the signal.
+        target_rate (int): desired sample rate.
+
+    Returns:
+        np.ndarray: the signal at the target rate, the input itself if the rates
+            are equal.
+    """
+    if orig_rate == target_rate:
+        return signal
+    divisor = gcd(int(orig_rate), int(target_rate))
+    up, down = int(target_rate) // divisor, int(orig_rate) // divisor
+    dtype = signal.dtype if np.issubdtype(signal.dtype, np.floating) else np.float32
+    resampled = resample_poly(
+        signal.astype(dtype, copy=False), up, down, window=_polyphase_filter(up, down)
+    )
+    return resampled.astype(dtype, copy=False)
@@ -1,18 +1,80 @@
-"""Utility functions for audio processing."""
+"""Utility functions for audio processing.
+
+The level functions work on one signal, or on many signals at once when an axis
+is given: the measured values then keep the reduced axis so they broadcast
+against the signals. Floating point signals keep their type.
+"""
+from typing import Optional, Union
+
 import numpy as np
 from loguru import logger
 
 
-def rms_amplitude(signal: np.ndarray) -> float:
+def _float_dtype(signal: np.ndarray) -> np.dtype:
+    """Get the type to compute levels of a signal in.
+
+    Args:
+        signal (np.ndarray): input signal.
+
+    Returns:
+        np.dtype: the signal type if it is floating point, else float64.
+    """
+    if np.issubdtype(signal.dtype, np.floating):
+        return signal.dtype
+    return np.dtype(np.float64)
+
+
+def rms_amplitude(
+    signal: np.ndarray, axis: Optional[int] = None
+) -> Union[float, np.ndarray]:
     """Calculate the RMS amplitude of a signal.
 
     Args:
         signal (np.ndarray): numpy array containing the signal.
+        axis (Optional[int]): axis along which each signal lies. Defaults to None,
+            the whole array is one signal.
+
+    Returns:
+        Union[float, np.ndarray]: RMS amplitude of the signal, or of each signal
+            with the axis kept.
+    """
+    squares = np.square(signal, dtype=_float_dtype(signal))
+    return np.sqrt(np.mean(squares, axis=axis, keepdims=axis is not None))
+
+
+def chunked_rms_amplitude(signal: np.ndarray, chunk_size: int = 2**20) -> float:
+    """Calculate the RMS amplitude of a long signal one chunk at a time.
+
+    Only one chunk is converted to float64 at a time, so the memory used does not
+    depend on the length of the signal (e.g. a memory-mapped file). As with
+    rms_amplitude, all the channels of a multi-channel signal are included.
+
+    Args:
+        signal (np.ndarray): numpy array containing the signal, chunked along the
+            first axis.
+        chunk_size (int): Number of samples per chunk. Defaults to 2**20.
 
     Returns:
         float: float containing the RMS amplitude of the signal.
     """
-    return np.sqrt(np.mean(signal**2))
+    sum_squares = 0.0
+    for start in range(0, len(signal), chunk_size):
+        chunk = np.asarray(signal[start : start + chunk_size], dtype=np.float64)
+        # vdot flattens the chunk, a dot product of 2D chunks is a matrix product.
+        sum_squares += float(np.vdot(chunk, chunk))
+    return np.sqrt(sum_squares / signal.size)
+
+
+def db_spl_to_rms(level: float) -> float:
+    """Get the RMS amplitude of a signal with a given level.
+
+    Args:
+        level (float): level in dB SPL.
+
+    Returns:
+        float: RMS amplitude giving this level.
+    """
+    return 20e-6 * 10 ** (level / 20)
 
 
 def calculate_snr_db(signal: np.ndarray, noise: np.ndarray) -> float:
@@ -33,20 +95,25 @@ def calculate_snr_db(signal: np.ndarray, noise: np.ndarray) -> float:
 
     # Calculate the SNR in dB
     snr_db = 20 * np.log10(signal_amplitude / noise_amplitude)
-    return snr_db
+    return float(snr_db)
 
 
-def calculate_db_spl(signal: np.ndarray) -> float:
+def calculate_db_spl(
+    signal: np.ndarray, axis: Optional[int] = None
+) -> Union[float, np.ndarray]:
     """Calculate dB SPL of a signal.
 
     Args:
         signal (np.ndarray): input signal.
+        axis (Optional[int]): axis along which each signal lies. Defaults to None,
+            the whole array is one signal.
 
     Returns:
-        float: level of the signal in dB SPL.
+        Union[float, np.ndarray]: level of the signal in dB SPL, or of each signal
+            with the axis kept.
     """
     # Calculate the RMS of the signal
-    rms = rms_amplitude(signal=signal)
+    rms = rms_amplitude(signal=signal, axis=axis)
 
     # Calculate the dB SPL
     db_spl = 20 * np.log10(rms / 20e-6)
@@ -54,46 +121,144 @@ def calculate_db_spl(signal: np.ndarray) -> float:
     return db_spl
 
 
-def convert_to_specific_db_spl(signal: np.ndarray, target_level: float) -> np.ndarray:
+def convert_to_specific_db_spl(
+    signal: np.ndarray,
+    target_level: Union[float, np.ndarray],
+    axis: Optional[int] = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """Get a signal and change it's level to a specific dB SPL.
 
     Args:
         signal (np.ndarray): inout signal.
-        target_level (float): desired level in dB SPL.
+        target_level (Union[float, np.ndarray]): desired level in dB SPL. An array
+            of levels broadcasting against the measured level gives one scaled
+            signal per level, e.g. shape (n_levels, 1) for a 1D signal.
+        axis (Optional[int]): axis along which each signal lies. Defaults to None,
+            the whole array is one signal.
+        inplace (bool): scale the (floating point) signal in place.
+            Defaults to False.
 
     Returns:
         np.ndarray: signal with the desired level.
     """
     # Calculate the current level of the signal
-    current_level = calculate_db_spl(signal)
+    current_level = calculate_db_spl(signal, axis=axis)
 
     # Calculate the difference between the current and desired level
-    diff = target_level - current_level
+    diff = np.asarray(target_level) - current_level
 
     # Calculate the factor to multiply the signal by
-    factor = 10 ** (diff / 20)
+    factor = np.asarray(10 ** (diff / 20), dtype=_float_dtype(signal))
 
     # Multiply the signal by the factor
-    signal = signal * factor
-    logger.debug(f"Current level: {calculate_db_spl(signal):.2f} dB SPL")
+    signal = _scale(signal, factor, inplace)
+    logger.opt(lazy=True).debug(
+        "Current level: {} dB SPL",
+        lambda: np.round(calculate_db_spl(signal, axis=axis), 2),
+    )
     return signal
 
 
-def convert_to_specific_rms(signal: np.ndarray, desired_rms: float) -> np.ndarray:
+def convert_to_specific_rms(
+    signal: np.ndarray,
+    desired_rms: Union[float, np.ndarray],
+    axis: Optional[int] = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """Convert a signal to a specific RMS.
 
     Args:
         signal (np.ndarray): input signal.
-        desired_rms (float): desired RMS.
+        desired_rms (Union[float, np.ndarray]): desired RMS, or an array of RMS
+            broadcasting against the measured one.
+        axis (Optional[int]): axis along which each signal lies. Defaults to None,
+            the whole array is one signal.
+        inplace (bool): scale the (floating point) signal in place.
+            Defaults to False.
 
     Returns:
         np.ndarray: scaled signal.
     """
-    current_rms = rms_amplitude(signal)
+    current_rms = rms_amplitude(signal, axis=axis)
 
     # Calculate the scaling factor
-    scaling_factor = desired_rms / current_rms
+    scaling_factor = np.asarray(desired_rms / current_rms, dtype=_float_dtype(signal))
 
     # Normalize the signal to the desired RMS amplitude
-    normalized_signal = signal * scaling_factor
-    return normalized_signal
+    return _scale(signal, scaling_factor, inplace)
+
+
+def _scale(signal: np.ndarray, factor: np.ndarray, inplace: bool) -> np.ndarray:
+    """Multiply a signal by a factor, in place if possible.
+
+    Args:
+        signal (np.ndarray): input signal.
+        factor (np.ndarray): factor broadcasting against the signal.
+        inplace (bool): write the result into the signal.
+
+    Raises:
+        ValueError: If the result does not fit in the signal.
+
+    Returns:
+        np.ndarray: scaled signal.
+    """
+    if not inplace:
+        return signal * factor
+    if np.broadcast_shapes(signal.shape, factor.shape) != signal.shape:
+        raise ValueError("A signal can only be scaled in place to one level")
+    signal *= factor
+    return signal
+
+
+def trim_silence(signal: np.ndarray, threshold_db: float = -40) -> np.ndarray:
+    """Remove the leading and trailing silence of a signal.
+
+    Args:
+        signal (np.ndarray): input signal.
+        threshold_db (float): level relative to the peak of the signal under which
+            a sample is considered silent. Defaults to -40.
+
+    Returns:
+        np.ndarray: view of the signal without the silent edges.
+    """
+    magnitude = np.abs(signal)
+    threshold = magnitude.max() * 10 ** (threshold_db / 20)
+    loud = np.flatnonzero(magnitude > threshold)
+    if len(loud) == 0:
+        return signal[:0]
+    return signal[loud[0] : loud[-1] + 1]
+
+
+def crossfade_concat(segments: list[np.ndarray], overlap: int) -> np.ndarray:
+    """Concatenate signals, overlapping consecutive ones with a crossfade.
+
+    The fades are raised-cosine ramps whose sum is one, so the level is kept
+    through the overlap.
+
+    Args:
+        segments (list[np.ndarray]): signals to concatenate.
+        overlap (int): number of overlapping samples between two signals. Limited
+            to the length of the shortest signal.
+
+    Returns:
+        np.ndarray: float32 signal.
+    """
+    overlap = max(0, min([overlap] + [len(segment) for segment in segments]))
+    total = sum(len(segment) for segment in segments) - overlap * (len(segments) - 1)
+    output = np.zeros(max(total, 0), dtype=np.float32)
+    fade_in = np.sin(np.linspace(0, np.pi / 2, overlap, dtype=np.float32)) ** 2
+    fade_out = 1 - fade_in
+
+    start = 0
+    for i, segment in enumerate(segments):
+        target = output[start : start + len(segment)]
+        target += segment
+        if overlap and i > 0:
+            target[:overlap] -= segment[:overlap] * fade_out
+        if overlap and i < len(segments) - 1:
+            target[len(segment) - overlap :] -= (
+                segment[len(segment) - overlap :] * fade_in
+            )
+        start += len(segment) - overlap
+    return output
@@ -0,0 +1,121 @@
+"""Registry of the pluggable backends and helpers to load them lazily."""
+
+import importlib
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class Registry:
+    """Map backend names to classes that are only imported when requested."""
+
+    def __init__(self, kind: str) -> None:
+        """Initialize an empty registry.
+
+        Args:
+            kind (str): What the backends are, used in error messages.
+        """
+        self.kind = kind
+        self._targets: dict[str, str] = {}
+
+    def register(self, name: str, target: str) -> None:
+        """Register a backend.
+
+        Args:
+            name (str): Name of the backend in the config file.
+            target (str): Location of the class as "module:ClassName".
+        """
+        self._targets[name] = target
+
+    def get(self, name: str) -> type:
+        """Import and return the class of a backend.
+
+        Args:
+            name (str): Name of the backend in the config file.
+
+        Raises:
+            NotImplementedError: If no backend is registered with this name.
+
+        Returns:
+            type: The class of the backend.
+        """
+        if name not in self._targets:
+            raise NotImplementedError(
+                f"Unknown {self.kind} '{name}', use one of {sorted(self._targets)}"
+            )
+        module_name, class_name = self._targets[name].split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+
+class Lazy(Generic[T]):
+    """Create an object on first use, or ahead of time in a background thread."""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        """Store the factory without calling it.
+
+        Args:
+            factory (Callable[[], T]): Function creating the object.
+        """
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the object has been created.
+
+        Returns:
+            bool: True once the factory has returned.
+        """
+        return self._value is not None
+
+    def get(self) -> T:
+        """Return the object, creating it if needed.
+
+        Returns:
+            T: The object.
+        """
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    def warm_up(self) -> None:
+        """Create the object in a background thread."""
+        if self._value is not None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._warm_up, daemon=True)
+        self._thread.start()
+
+    def _warm_up(self) -> None:
+        """Create the object and log failures instead of raising them."""
+        try:
+            self.get()
+        except Exception as exc:
+            logger.warning(f"Background loading failed, retrying on first use: {exc}")
+
+
+VOCALIZERS = Registry("vocalizer")
+VOCALIZERS.register("recorded", "vocalizer.vocalizer:Recorded")
+VOCALIZERS.register("tts", "vocalizer.vocalizer:TTS")
+VOCALIZERS.register("prerendered", "vocalizer.vocalizer:Prerendered")
+
+NOISES = Registry("noise")
+NOISES.register("white", "audio_processing.noise:WhiteNoise")
+NOISES.register("babble", "audio_processing.noise:Babble")
+NOISES.register("streamed", "audio_processing.noise:StreamedBabble")
+NOISES.register("multitalker", "audio_processing.noise:MultiTalkerBabble")
+NOISES.register("speech_shaped", "audio_processing.noise:SpeechShapedNoise")
+
+ASRS = Registry("asr")
+ASRS.register("SpeechBrain", "get_response.asr:SpeechBrainASR")
+ASRS.register("SimpleASR", "get_response.simple_asr:SimpleASR")
+
+AUDIO_BACKENDS = Registry("audio backend")
+AUDIO_BACKENDS.register("hardware", "audio_processing.devices:HardwareBackend")
+AUDIO_BACKENDS.register("virtual", "audio_processing.devices:VirtualBackend")
@@ -0,0 +1,252 @@
+"""Measure the latency of the parts of the hearing test."""
+
+import argparse
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+from scipy import signal as sps
+
+from stimuli_generator.questions import DigitQuestions
+
+logger.remove(0)
+logger.add(sys.stderr, level="INFO")
+
+
+def spectral_similarity(reference: np.ndarray, other: np.ndarray) -> float:
+    """Compare two waveforms by the cosine similarity of their log spectrograms.
+
+    The spectrograms are cut to the shorter of the two, since optimized models
+    may stop decoding a few frames earlier or later.
+
+    Args:
+        reference (np.ndarray): waveform of the reference model.
+        other (np.ndarray): waveform to compare.
+
+    Returns:
+        float: similarity between 0 and 1.
+    """
+    _, _, ref_spec = sps.stft(reference, nperseg=1024)
+    _, _, other_spec = sps.stft(other, nperseg=1024)
+    frames = min(ref_spec.shape[1], other_spec.shape[1])
+    ref_log = np.log1p(np.abs(ref_spec[:, :frames])).ravel()
+    other_log = np.log1p(np.abs(other_spec[:, :frames])).ravel()
+    norm = np.linalg.norm(ref_log) * np.linalg.norm(other_log)
+    return float(ref_log @ other_log / norm) if norm else 0.0
+
+
+def summarize(name: str, latencies: list[float]) -> None:
+    """Log the mean, median and 95th percentile of latencies.
+
+    Args:
+        name (str): What was measured.
+        latencies (list[float]): Measured durations in seconds.
+    """
+    values = np.array(latencies) * 1000
+    logger.info(
+        f"{name}: mean {values.mean():.2f} ms, median {np.median(values):.2f} ms, "
+        f"p95 {np.percentile(values, 95):.2f} ms over {len(values)} runs"
+    )
+
+
+def benchmark_tts(args: argparse.Namespace) -> None:
+    """Compare the float and the fast inference TTS on the digit corpus.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    from vocalizer.vocalizer import TTS
+
+    texts = DigitQuestions().all_stimuli()
+    texts = [texts[i] for i in np.random.default_rng(0).permutation(len(texts))]
+    texts = texts[: args.stimuli]
+
+    outputs: dict[bool, list[np.ndarray]] = {}
+    for fast in (False, True):
+        tts = TTS(device="cpu", fast_inference=fast, threads=args.threads)
+        start = time.perf_counter()
+        tts.get_sound(texts[0])
+        logger.info(f"fast_inference={fast}: load {time.perf_counter() - start:.1f}s")
+
+        latencies, outputs[fast] = [], []
+        for text in texts:
+            start = time.perf_counter()
+            outputs[fast].append(tts.get_sound(text))
+            latencies.append(time.perf_counter() - start)
+        summarize(f"TTS fast_inference={fast}", latencies)
+
+    similarities = [
+        spectral_similarity(reference, fast)
+        for reference, fast in zip(outputs[False], outputs[True])
+    ]
+    length_ratios = [
+        len(fast) / len(reference)
+        for reference, fast in zip(outputs[False], outputs[True])
+    ]
+    logger.info(
+        f"Similarity to float: mean {np.mean(similarities):.3f}, "
+        f"min {np.min(similarities):.3f}; "
+        f"length ratio {np.min(length_ratios):.2f}-{np.max(length_ratios):.2f}"
+    )
+
+
+def benchmark_sweep(args: argparse.Namespace) -> None:
+    """Compare per-SNR and single-pass mixing of an SNR sweep over every stimuli.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    from audio_processing.noise import WhiteNoise
+
+    rng = np.random.default_rng(0)
+    n_stimuli = len(DigitQuestions().all_stimuli())
+    snrs = np.arange(args.min_snr, args.max_snr + 1, args.step, dtype=np.float32)
+    signal = rng.standard_normal(int(args.duration * 44100)).astype(np.float32)
+    noise = WhiteNoise(seed=0)
+
+    start = time.perf_counter()
+    for _ in range(n_stimuli):
+        for snr in snrs:
+            signal + noise.generate_noise(signal, snr)
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(n_stimuli):
+        noise.mix_snrs(signal, snrs)
+    single_pass = time.perf_counter() - start
+    logger.info(
+        f"{n_stimuli} stimuli x {len(snrs)} SNRs: per SNR {looped:.2f}s, "
+        f"single pass {single_pass:.2f}s"
+    )
+
+
+def benchmark_vad(args: argparse.Namespace) -> None:
+    """Measure the CPU cost of the voice activity detection per microphone chunk.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    from get_response.vad import VAD, pcm16_rms
+
+    rng = np.random.default_rng(0)
+    n_samples = int(args.seconds * args.sample_rate)
+    noise = rng.normal(scale=0.005, size=n_samples)
+    speech = np.sin(2 * np.pi * 200 * np.arange(n_samples) / args.sample_rate) * 0.3
+    gate = (np.arange(n_samples) // args.sample_rate) % 2 == 1
+    pcm = ((noise + speech * gate) * 32767).astype(np.int16).tobytes()
+    chunk_bytes = args.chunk * 2
+    chunks = [pcm[i : i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+
+    for name, process in (("rms", pcm16_rms), ("VAD", VAD(args.sample_rate).process)):
+        latencies = []
+        for chunk in chunks:
+            start = time.perf_counter()
+            process(chunk)
+            latencies.append(time.perf_counter() - start)
+        summarize(name, latencies)
+    logger.info(f"Chunk duration: {args.chunk / args.sample_rate * 1000:.2f} ms")
+
+
+def benchmark_session(args: argparse.Namespace) -> None:
+    """Run a whole ASR test on virtual audio devices and time its trials.
+
+    The stimuli are played into memory and each one is answered with the next
+    recorded response of the responses directory, so the session runs without
+    a sound card or a participant.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    from util import get_prefetcher, get_test_manager, read_conf, run_test
+    from vocalizer.utils import close_players
+
+    configs = read_conf(args.config)
+    configs["response_capturing"] = "asr"
+    configs.setdefault("audio", {})["backend"] = "virtual"
+    configs["audio"]["virtual"] = {
+        "responses_dir": args.responses,
+        "output": args.output,
+        "speed": args.speed,
+        "response_delay_ms": args.response_delay_ms,
+    }
+    with tempfile.TemporaryDirectory() as record_dir:
+        configs["test"]["record_save_dir"] = record_dir
+        start = time.perf_counter()
+        manager = get_test_manager(configs)
+        manager.warm_up()
+        prefetcher = get_prefetcher(manager, configs)
+        prefetcher.start()
+        try:
+            durations = run_test(manager, prefetcher, start, interactive=False)
+        finally:
+            prefetcher.stop()
+            close_players()
+            manager.close()
+    total = time.perf_counter() - start
+    summarize(f"Trials at speed {args.speed}", durations)
+    logger.info(
+        f"Session: {len(durations)} trials in {total:.2f}s, "
+        f"{len(durations) / total * 60:.1f} trials per minute"
+    )
+
+
+def _summary(func: Callable) -> str:
+    """Get the first line of the docstring of a subcommand.
+
+    Args:
+        func (Callable): The function running the subcommand.
+
+    Returns:
+        str: Summary line of its docstring.
+    """
+    return (func.__doc__ or "").strip().split("\n")[0]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tts = commands.add_parser("tts", help=_summary(benchmark_tts))
+    tts.add_argument("--stimuli", type=int, default=50)
+    tts.add_argument("--threads", type=int, default=None)
+    tts.set_defaults(func=benchmark_tts)
+
+    sweep = commands.add_parser("sweep", help=_summary(benchmark_sweep))
+    sweep.add_argument("--min-snr", type=float, default=-20)
+    sweep.add_argument("--max-snr", type=float, default=20)
+    sweep.add_argument("--step", type=float, default=1)
+    sweep.add_argument("--duration", type=float, default=2.5)
+    sweep.set_defaults(func=benchmark_sweep)
+
+    vad = commands.add_parser("vad", help=_summary(benchmark_vad))
+    vad.add_argument("--chunk", type=int, default=1024)
+    vad.add_argument("--sample-rate", type=int, default=44100)
+    vad.add_argument("--seconds", type=float, default=60)
+    vad.set_defaults(func=benchmark_vad)
+
+    session = commands.add_parser("session", help=_summary(benchmark_session))
+    session.add_argument("responses", help="directory of the recorded responses")
+    session.add_argument("--config", default="config.yaml")
+    session.add_argument("--speed", type=float, default=1.0)
+    session.add_argument("--response-delay-ms", type=float, default=300)
+    session.add_argument("--output", default=None)
+    session.set_defaults(func=benchmark_session)
+    return parser.parse_args()
+
+
+def main():
+    """Code entry point."""
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
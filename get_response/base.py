@@ -13,3 +13,6 @@ class CaptureResponse(ABC):
             str: transcribe of the file.
         """
         ...
+
+    def warm_up(self) -> None:  # noqa: B027
+        """Prepare the models ahead of the first response, if there are any."""
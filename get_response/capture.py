@@ -0,0 +1,170 @@
+"""Capture the microphone through one persistent input stream into a ring buffer."""
+
+import threading
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from audio_processing.devices import AudioBackend, AudioStream, get_backend
+
+
+class CaptureStream:
+    """Keep one input stream open and store what it captures in a ring buffer.
+
+    The stream callback is the only writer of the buffer and readers never block
+    it: frames are addressed by their absolute position since the stream
+    started, and a reader asking for frames that were already overwritten gets
+    the oldest ones still available. Utterances can therefore start before the
+    moment they are detected, as long as that is within the buffer.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 44100,
+        chunk: int = 1024,
+        buffer_seconds: float = 30.0,
+        backend: Optional[AudioBackend] = None,
+    ) -> None:
+        """Initialize the buffer, the stream is opened on first use.
+
+        Args:
+            sample_rate (int): sample per second. Defaults to 44100.
+            chunk (int): frames delivered by each callback. Defaults to 1024.
+            buffer_seconds (float): Capacity of the ring buffer. Defaults to 30.0.
+            backend (Optional[AudioBackend]): Devices to capture from. Defaults to
+                None, the backend set with audio_processing.devices.set_backend.
+        """
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.backend = backend
+        self._buffer = np.zeros(int(buffer_seconds * sample_rate), dtype=np.int16)
+        # Monotonic frame counter, only moved by the callback.
+        self._written = 0
+        self._data = threading.Event()
+        self._stream: Optional[AudioStream] = None
+        self.overflows = 0
+        self.overruns = 0
+
+    @property
+    def position(self) -> int:
+        """Number of frames captured since the stream started.
+
+        Returns:
+            int: position after the last captured frame.
+        """
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """Position of the oldest frame still in the buffer.
+
+        Returns:
+            int: position of the frame.
+        """
+        return max(0, self._written - len(self._buffer))
+
+    @property
+    def stats(self) -> dict:
+        """Overflow counts of the stream.
+
+        Returns:
+            dict: device overflows, and frames overwritten before being read.
+        """
+        return {"overflows": self.overflows, "overruns": self.overruns}
+
+    def start(self) -> None:
+        """Open and start the input stream if it is not running."""
+        if self._stream is not None:
+            return
+        backend = self.backend or get_backend()
+        stream = backend.open_input(self.sample_rate, self.chunk, self._callback)
+        stream.start()
+        self._stream = stream
+        logger.debug(f"Input stream opened, latency {stream.latency:.4f}s")
+
+    def close(self) -> None:
+        """Stop the stream and release the device."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._data.set()
+        logger.debug(f"Input stream closed: {self.stats}")
+
+    def wait(self, position: int, timeout: Optional[float] = None) -> bool:
+        """Wait until frames after a position have been captured.
+
+        Args:
+            position (int): position of the last frame already read.
+            timeout (Optional[float]): Longest wait in seconds. Defaults to None.
+
+        Returns:
+            bool: Whether new frames are available.
+        """
+        while self._written <= position:
+            self._data.clear()
+            if self._written > position:
+                break
+            if not self._data.wait(timeout) or self._stream is None:
+                return self._written > position
+        return True
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Copy the captured frames between two positions.
+
+        Args:
+            start (int): position of the first frame.
+            end (int): position after the last frame, at most position.
+
+        Returns:
+            np.ndarray: int16 frames, starting at the oldest available frame if
+                start was overwritten.
+        """
+        oldest = self.oldest
+        if start < oldest:
+            self.overruns += oldest - start
+            logger.warning(f"{oldest - start} captured frames were overwritten")
+            start = oldest
+        end = max(start, min(end, self._written))
+        capacity = len(self._buffer)
+        first = start % capacity
+        count = end - start
+        if first + count <= capacity:
+            frames = self._buffer[first : first + count].copy()
+        else:
+            frames = np.concatenate(
+                (self._buffer[first:], self._buffer[: first + count - capacity])
+            )
+        # The callback may have overwritten the frames while they were copied.
+        if start < self.oldest:
+            return self.read(start, end)
+        return frames
+
+    def _callback(self, in_data: bytes, frame_count: int, time_info, status: int):
+        """Copy the frames delivered by the device into the ring buffer.
+
+        Args:
+            in_data (bytes): captured 16 bit frames.
+            frame_count (int): number of frames.
+            time_info (dict): Timing information of the stream.
+            status (int): PortAudio status flags, non-zero on overflow.
+
+        Returns:
+            tuple: No output data, and the flag to continue the stream.
+        """
+        if status:
+            self.overflows += 1
+        frames = np.frombuffer(in_data, dtype=np.int16)
+        capacity = len(self._buffer)
+        if len(frames) > capacity:
+            self._written += len(frames) - capacity
+            frames = frames[-capacity:]
+        position = self._written % capacity
+        first = min(len(frames), capacity - position)
+        self._buffer[position : position + first] = frames[:first]
+        self._buffer[: len(frames) - first] = frames[first:]
+        self._written += len(frames)
+        self._data.set()
+        # pyaudio.paContinue, without importing pyaudio.
+        return None, 0
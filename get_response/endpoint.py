@@ -0,0 +1,123 @@
+"""Decide when the participant has finished responding."""
+
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+
+class Endpointer:
+    """End a response early once it is complete, with a hard maximum as fallback.
+
+    A response ends when, in order of precedence:
+
+    - it reaches max_duration;
+    - nothing was said within timeout seconds;
+    - n_segments speech segments were heard, followed by min_hangover seconds
+      of silence;
+    - the silence after the last segment is longer than the hangover. The
+      hangover is learned from the participant's own pauses between words:
+      hangover_factor times the 90th percentile of the recent pauses, between
+      min_hangover and timeout. Until enough pauses are known it is timeout.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 3.0,
+        n_segments: int = 3,
+        min_segment: float = 0.1,
+        min_hangover: float = 0.3,
+        hangover_factor: float = 2.0,
+        max_duration: float = 10.0,
+        history: int = 30,
+    ) -> None:
+        """Initialize the endpointer.
+
+        Args:
+            timeout (float): Longest silence in seconds, before and after speech.
+                Defaults to 3.0.
+            n_segments (int): Number of segments making a complete response, 0 to
+                disable. Defaults to 3.
+            min_segment (float): Shortest segment counted as a word in seconds.
+                Defaults to 0.1.
+            min_hangover (float): Shortest silence ending a response in seconds.
+                Defaults to 0.3.
+            hangover_factor (float): Hangover relative to the usual pause of the
+                participant. Defaults to 2.0.
+            max_duration (float): Longest response in seconds. Defaults to 10.0.
+            history (int): Number of recent pauses the hangover is learned from.
+                Defaults to 30.
+        """
+        self.timeout = timeout
+        self.n_segments = n_segments
+        self.min_segment = min_segment
+        self.min_hangover = min_hangover
+        self.hangover_factor = hangover_factor
+        self.max_duration = max_duration
+        self._pauses: deque[float] = deque(maxlen=history)
+        self.start()
+
+    @property
+    def hangover(self) -> float:
+        """Silence ending a response that is not yet complete.
+
+        Returns:
+            float: hangover in seconds.
+        """
+        if len(self._pauses) < 3:
+            return self.timeout
+        usual_pause = float(np.percentile(self._pauses, 90))
+        return float(
+            np.clip(self.hangover_factor * usual_pause, self.min_hangover, self.timeout)
+        )
+
+    def start(self) -> None:
+        """Prepare for a new response, keeping the learned pauses."""
+        self.segments = 0
+        self._in_segment = False
+        self._segment_start = 0.0
+        self._last_speech: Optional[float] = None
+
+    def update(self, time: float, is_speech: bool) -> bool:
+        """Update the endpointer with the state of the VAD.
+
+        Args:
+            time (float): time since the start of the response in seconds.
+            is_speech (bool): whether there is speech at that time.
+
+        Returns:
+            bool: Whether the response has ended.
+        """
+        if is_speech and not self._in_segment:
+            self._in_segment = True
+            self._segment_start = time
+            if self._last_speech is not None:
+                self._pauses.append(time - self._last_speech)
+        elif not is_speech and self._in_segment:
+            self._in_segment = False
+            if time - self._segment_start >= self.min_segment:
+                self.segments += 1
+        if is_speech:
+            self._last_speech = time
+
+        if time >= self.max_duration:
+            reason = "maximum duration"
+        elif is_speech:
+            return False
+        elif self._last_speech is None:
+            if time < self.timeout:
+                return False
+            reason = "no speech"
+        else:
+            silence = time - self._last_speech
+            if self.n_segments and self.segments >= self.n_segments:
+                if silence < self.min_hangover:
+                    return False
+                reason = f"{self.segments} segments"
+            elif silence >= self.hangover:
+                reason = f"{silence:.2f}s of silence"
+            else:
+                return False
+        logger.debug(f"Response ended at {time:.2f}s: {reason}")
+        return True
@@ -1,132 +1,203 @@
 """Module for recording voice."""
-import math
-import os
-import struct
-import time
-import wave
+from concurrent.futures import Future
+from typing import Callable, NamedTuple, Optional
 
-import pyaudio
+import numpy as np
 from loguru import logger
 
-SHORT_NORMALIZE = (
-    1.0 / 32768.0
-)  # Normalize the sound, the value is because of the Int16 range -32768 to +32767.
+from audio_processing.devices import AudioBackend
+from get_response.capture import CaptureStream
+from get_response.endpoint import Endpointer
+from get_response.vad import VAD, pcm16_rms
+from get_response.writer import RecordingWriter
 
-FORMAT = pyaudio.paInt16
-CHANNELS = 1
 SAMPLING_RATE = 44100
-sample_width = 2
+
+
+class Recording(NamedTuple):
+    """A captured response, with the file it is being saved to."""
+
+    audio: np.ndarray
+    sample_rate: int
+    saved: Future
 
 
 class Recorder:
-    """Record sound when there is a noise."""
+    """Record sound when there is a noise.
+
+    The microphone is captured for the whole session by one CaptureStream. Each
+    response is cut from its buffer, from pre_roll seconds before the detected
+    speech onset until the endpointer decides the response is over.
+    """
 
     @staticmethod
     def rms(frame: bytes) -> float:
         """Calculate RMS of the input signal.
 
-        Convert the input bytes to a list of values and
-        calculate the root mean square error of the input signal.
-
         Args:
             frame (bytes): input stream as bytes
 
         Returns:
-            float: rms of the input signal.
+            float: rms of the input signal, in thousandths of full scale.
         """
-        count = len(frame) / sample_width
-        count_format = "%dh" % (count)
-        shorts = struct.unpack(count_format, frame)
-        sum_squares = 0.0
-        for sample in shorts:
-            n = sample * SHORT_NORMALIZE
-            sum_squares += n * n
-        rms = math.pow(sum_squares / count, 0.5)
-        return rms * 1000
+        return pcm16_rms(frame)
 
     def __init__(
         self,
         store: bool,
         chunk: int,
-        rms_threshold: int,
         timeout_length: int,
         save_dir: str,
+        sample_rate: int = SAMPLING_RATE,
+        vad: Optional[VAD] = None,
+        pre_roll: float = 0.3,
+        buffer_seconds: float = 30.0,
+        file_format: str = "wav",
+        fsync_every: int = 5,
+        endpointer: Optional[Endpointer] = None,
+        backend: Optional[AudioBackend] = None,
     ):
-        """Initialize the PyAudio stream for voice recording.
+        """Initialize the capture stream for voice recording.
 
         Args:
             store (bool): Store the recorded file or not.
             chunk (int): How much data to read from microphone stream.
-            rms_threshold (int): Threshold for detecting the presence of the sound.
             timeout_length (int): How long to wait if there is no sound.
             save_dir (str): Where to save the recorded sound
+            sample_rate (int): Sample rate of the microphone. Defaults to 44100.
+            vad (Optional[VAD]): Detector of the voice in the stream. Defaults to
+                None, a VAD with its default settings.
+            pre_roll (float): Audio kept before the speech onset in seconds.
+                Defaults to 0.3.
+            buffer_seconds (float): Capacity of the capture buffer in seconds.
+                Defaults to 30.0.
+            file_format (str): Format of the stored recordings, "wav" or "flac".
+                Defaults to "wav".
+            fsync_every (int): Number of recordings synced to disk at once.
+                Defaults to 5.
+            endpointer (Optional[Endpointer]): Decides when a response ends.
+                Defaults to None, an Endpointer with timeout_length as timeout.
+            backend (Optional[AudioBackend]): Devices to capture from. Defaults to
+                None, the backend set with audio_processing.devices.set_backend.
         """
+        self.sample_rate = sample_rate
         self.timeout_length = timeout_length
         self.store = store
-        self.p = pyaudio.PyAudio()
         self.chunk = chunk
-        self.rms_threshold = rms_threshold
+        self.vad = vad or VAD(sample_rate)
+        self.endpointer = endpointer or Endpointer(timeout=timeout_length)
         self.save_dir = save_dir
+        self.pre_roll_frames = int(pre_roll * sample_rate)
+        self.capture = CaptureStream(sample_rate, chunk, buffer_seconds, backend)
+        self.writer = (
+            RecordingWriter(save_dir, sample_rate, file_format, fsync_every=fsync_every)
+            if store
+            else None
+        )
 
-    def record(self) -> str:
+    def record(
+        self, on_segment: Optional[Callable[[np.ndarray], None]] = None
+    ) -> Recording:
         """Listen to microphone and record as long as sound is present.
 
+        Speech is detected from the call on, and the recording starts pre_roll
+        seconds before the detected onset, so speech starting just before the
+        call is kept. Without speech, only the audio captured from the call on is
+        kept, since what precedes it may still be the stimulus. The recording is
+        saved in the background.
+
+        Args:
+            on_segment (Optional[Callable[[np.ndarray], None]]): Called with the
+                samples of each speech segment as soon as the VAD closes it, with
+                up to pre_roll seconds before its onset. Defaults to None.
+
         Returns:
-            str: Address of saved file.
+            Recording: 16 bit samples of the response, and a future completed with
+                the address of the saved file once written.
         """
-        logger.debug("Noise detected, recording beginning")
-        rec = []
-        current = time.time()
-        end = time.time() + self.timeout_length
-
-        while current <= end:
-            data = self.stream.read(self.chunk)
-            if self.rms(data) >= self.rms_threshold:
-                end = time.time() + self.timeout_length
-            current = time.time()
-            rec.append(data)
-        sound = b"".join(rec)
-        address = ""
-        if self.store:
-            address = self.write(sound)
-        return address
-
-    def write(self, recording: bytes) -> str:
-        """Write the recorded sound as a WAV file.
+        start = self.capture.position
+        position = start
+        onset = segment_start = None
+        segment_floor = self.capture.oldest
+        self.vad.reset()
+        self.endpointer.start()
+
+        ended = False
+        while not ended:
+            if not self.capture.wait(position, timeout=1.0):
+                logger.warning("The microphone stopped sending audio")
+                break
+            end = min(self.capture.position, position + self.chunk)
+            is_speech = self.vad.process(self.capture.read(position, end).tobytes())
+            if is_speech:
+                if onset is None:
+                    onset = position
+                    logger.debug("Noise detected, recording beginning")
+                if segment_start is None:
+                    segment_start = max(segment_floor, position - self.pre_roll_frames)
+            elif segment_start is not None:
+                self._emit_segment(on_segment, segment_start, end)
+                segment_start, segment_floor = None, end
+            ended = self.endpointer.update((end - start) / self.sample_rate, is_speech)
+            position = end
+        if segment_start is not None:
+            self._emit_segment(on_segment, segment_start, position)
+
+        if onset is not None:
+            start = max(self.capture.oldest, onset - self.pre_roll_frames)
+        audio = self.capture.read(start, position)
+        return Recording(audio, self.sample_rate, self.write(audio.tobytes()))
+
+    def _emit_segment(
+        self,
+        on_segment: Optional[Callable[[np.ndarray], None]],
+        start: int,
+        end: int,
+    ) -> None:
+        """Hand a closed speech segment to the callback.
+
+        Args:
+            on_segment (Optional[Callable[[np.ndarray], None]]): The callback.
+            start (int): capture position of the first frame of the segment.
+            end (int): capture position after its last frame.
+        """
+        if on_segment is not None:
+            on_segment(self.capture.read(start, end))
+
+    def write(self, recording: bytes) -> Future:
+        """Save the recorded sound in the background.
 
         Args:
             recording (bytes): Recorded sound
 
         Returns:
-            str: Address of saved file.
+            Future: Completed with the address of the saved file, or an empty
+                address if recordings are not stored.
         """
-        n_files = len(os.listdir(self.save_dir))
-        filename = os.path.join(self.save_dir, "{}.wav".format(n_files))
-        wf = wave.open(filename, "wb")
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(self.p.get_sample_size(FORMAT))
-        wf.setframerate(SAMPLING_RATE)
-        wf.writeframes(recording)
-        wf.close()
-        logger.debug("Written to file: {}".format(filename))
-        return filename
-
-    def listen(self) -> str:
+        if self.writer is None:
+            future: Future = Future()
+            future.set_result("")
+            return future
+        return self.writer.submit(recording)
+
+    def listen(
+        self, on_segment: Optional[Callable[[np.ndarray], None]] = None
+    ) -> Recording:
         """Listen for the presence of a sound, and record the sound until it stop.
 
+        Args:
+            on_segment (Optional[Callable[[np.ndarray], None]]): Called with each
+                speech segment as soon as it ends. Defaults to None.
+
         Returns:
-            str: Address of recorded file.
+            Recording: The recorded response.
         """
         logger.debug("Start Talking")
-        self.stream = self.p.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=SAMPLING_RATE,
-            input=True,
-            output=True,
-            frames_per_buffer=self.chunk,
-        )
-
-        file_address = self.record()
-
-        return file_address
+        self.capture.start()
+        return self.record(on_segment)
+
+    def close(self) -> None:
+        """Stop capturing the microphone and write the pending recordings."""
+        self.capture.close()
+        if self.writer is not None:
+            self.writer.close()
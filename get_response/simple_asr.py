@@ -0,0 +1,184 @@
+"""Digit recognizer trained on Digit MNIST."""
+import math
+
+import numpy as np
+import tensorflow as tf
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent
+
+from backends import Lazy
+from get_response.asr import ASR
+
+MODEL_PATH = "/Users/user/Documents/Projects/PhD/Wordnet-Hearing-Test/models/asr/mnistASR/mnist.h5"  # noqa: E501
+
+
+class SimpleASR(ASR):
+    """Class for creating an digit recognizer ASR trained on Digit MNIST."""
+
+    def __init__(self) -> None:
+        """Initialize the class, the model is loaded on first use."""
+        super().__init__()
+        self._asr_model = Lazy(lambda: tf.keras.models.load_model(MODEL_PATH))
+        self.label = {
+            0: "zero",
+            1: "one",
+            2: "two",
+            3: "three",
+            4: "four",
+            5: "five",
+            6: "six",
+            7: "seven",
+            8: "eight",
+            9: "nine",
+        }
+
+    @property
+    def asr_model(self) -> tf.keras.Model:
+        """The digit recognizer, loaded on first use.
+
+        Returns:
+            tf.keras.Model: The Keras model.
+        """
+        return self._asr_model.get()
+
+    def warm_up(self) -> None:
+        """Load the model in a background thread."""
+        self._asr_model.warm_up()
+
+    def _get_spectrogram(self, waveform: tf.Tensor) -> tf.Tensor:
+        """Get spectrogram of the input waveform.
+
+        Args:
+            waveform (tf.Tensor): Input Audio.
+
+        Returns:
+            tf.Tensor: Spectrogram of the input audio.
+        """
+        # Convert the waveform to a spectrogram via a STFT.
+        spectrogram = tf.signal.stft(waveform, frame_length=255, frame_step=128)
+        # Obtain the magnitude of the STFT.
+        spectrogram = tf.abs(spectrogram)
+        # Add a `channels` dimension, so that the spectrogram can be used
+        # as image-like input data with convolution layers (which expect
+        # shape (`batch_size`, `height`, `width`, `channels`).
+        spectrogram = spectrogram[..., tf.newaxis]
+        return spectrogram
+
+    def _read_file(self, src: str) -> tuple[tf.Tensor, tf.Tensor]:
+        """Read the wav file and return the audio and sample rate.
+
+        Args:
+            src (str): File address.
+
+        Returns:
+            tuple[tf.Tensor, tf.Tensor]: Audio and sample rate.
+        """
+        wav_file: tf.Tensor = tf.io.read_file(str(src))
+        wav_file, sample_rate = tf.audio.decode_wav(wav_file, desired_channels=1)
+        wav_file = tf.squeeze(wav_file, axis=-1)
+        return wav_file, sample_rate
+
+    def _get_features(self, wav_file: tf.Tensor) -> tf.Tensor:
+        """Extract features from the input audio.
+
+        Args:
+            wav_file (tf.Tensor): Input audio.
+
+        Returns:
+            tf.Tensor: Extracted features.
+        """
+        if wav_file.shape[0] >= 44000:
+            wav_file = tf.slice(wav_file, [0], [44000])
+        else:
+            paddings = tf.constant(
+                [
+                    [
+                        0,
+                        44000 - wav_file.shape[0],
+                    ]
+                ]
+            )
+
+            wav_file = tf.pad(wav_file, paddings, "CONSTANT")
+
+        wav_file = self._get_spectrogram(wav_file)
+        wav_file = wav_file[tf.newaxis, ...]
+        return wav_file
+
+    def _split_digits(
+        self, wav_file: AudioSegment, tf_audio: tf.Tensor
+    ) -> list[tf.Tensor]:
+        """Split the audio file based on silence. Each chunk is a digit.
+
+        Args:
+            wav_file (AudioSegment): Wave file read by pydub.
+            tf_audio (tf.Tensor): Wave file read by tensorflow.
+
+        Returns:
+            list[tf.Tensor]: List of start and end number showing the start and end
+                of each chunk.
+        """
+        chunks = detect_nonsilent(wav_file, min_silence_len=100, silence_thresh=-50)
+        audio_segment = []
+        added_window = int(math.fabs(wav_file.frame_rate * 0.2))
+        for start, end in chunks:
+            start_pos = max(
+                math.ceil(start / 1000 * wav_file.frame_rate) - added_window,
+                0,
+            )
+            end_pos = min(
+                math.ceil(end / 1000 * wav_file.frame_rate) + added_window,
+                tf_audio.shape[0],
+            )
+
+            audio_segment.append(tf_audio[start_pos:end_pos])
+        return audio_segment
+
+    def _transcribe(self, src: str) -> str:
+        """Get a wav file address and return the transcription of it.
+
+        Args:
+            src (str): File address.
+
+        Returns:
+            str: transcribe of the file.
+        """
+        wav_file, sample_rate = self._read_file(src)
+        return self._recognize(AudioSegment.from_wav(src), wav_file)
+
+    def _transcribe_audio(self, audio: np.ndarray, sample_rate: int) -> str:
+        """Transcribe a recording held in memory.
+
+        Args:
+            audio (np.ndarray): 16 bit mono samples.
+            sample_rate (int): sample rate of the recording.
+
+        Returns:
+            str: transcribe of the recording.
+        """
+        audio = np.asarray(audio, dtype=np.int16)
+        segment = AudioSegment(
+            data=audio.tobytes(), sample_width=2, frame_rate=sample_rate, channels=1
+        )
+        # decode_wav scales 16 bit samples to [-1, 1).
+        tf_audio = tf.constant(audio.astype(np.float32) / 32768)
+        return self._recognize(segment, tf_audio)
+
+    def _recognize(self, segment: AudioSegment, tf_audio: tf.Tensor) -> str:
+        """Split a recording into digits and recognize each of them.
+
+        Args:
+            segment (AudioSegment): The recording read by pydub.
+            tf_audio (tf.Tensor): The recording as a tensor.
+
+        Returns:
+            str: transcribe of the recording.
+        """
+        chunks = self._split_digits(segment, tf_audio)
+        result_text = ""
+        for digit in chunks:
+            sample = self._get_features(digit)
+            prediction = self.asr_model(sample)
+            result = tf.nn.softmax(prediction[0])
+            result_text = result_text + " " + self.label[tf.argmax(result).numpy()]
+        return result_text.strip()
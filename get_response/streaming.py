@@ -0,0 +1,71 @@
+"""Transcribe the speech segments of a response while it is being recorded."""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+from get_response.asr import ASR
+
+
+class StreamingRecognizer:
+    """Transcribe each speech segment as soon as the VAD closes it.
+
+    Segments are decoded one after the other by a background thread while the
+    capture continues, so once the response ends only the segments still in
+    the queue, usually the last one, remain to be decoded.
+    """
+
+    def __init__(self, asr: ASR, sample_rate: int) -> None:
+        """Initialize the recognizer.
+
+        Args:
+            asr (ASR): engine transcribing the segments.
+            sample_rate (int): sample rate of the segments.
+        """
+        self.asr = asr
+        self.sample_rate = sample_rate
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._segments: list[Future] = []
+
+    def reset(self) -> None:
+        """Forget the segments of the previous response."""
+        for future in self._segments:
+            future.cancel()
+        self._segments = []
+
+    def add(self, audio: np.ndarray) -> None:
+        """Queue a speech segment for transcription.
+
+        Args:
+            audio (np.ndarray): 16 bit mono samples of the segment.
+        """
+        index = len(self._segments)
+        logger.debug(f"Speech segment {index}: {len(audio) / self.sample_rate:.2f}s")
+        self._segments.append(self._executor.submit(self._transcribe, audio))
+
+    def result(self) -> str:
+        """Wait for the queued segments and join their transcriptions.
+
+        Returns:
+            str: transcription of the response.
+        """
+        texts = [future.result() for future in self._segments]
+        self._segments = []
+        return " ".join(text.strip() for text in texts if text.strip())
+
+    def close(self) -> None:
+        """Stop the background thread."""
+        self.reset()
+        self._executor.shutdown(wait=True)
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe one segment.
+
+        Args:
+            audio (np.ndarray): 16 bit mono samples of the segment.
+
+        Returns:
+            str: transcription of the segment.
+        """
+        return self.asr.get(audio=audio, sample_rate=self.sample_rate)
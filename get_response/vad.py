@@ -0,0 +1,149 @@
+"""Detect the voice of the participant in the microphone stream."""
+
+from typing import Optional, Union
+
+import numpy as np
+
+# Normalize the sound, the value is because of the Int16 range -32768 to +32767.
+SHORT_NORMALIZE = 1.0 / 32768.0
+
+
+def pcm16_rms(frame: bytes) -> float:
+    """Calculate the RMS of 16 bit PCM audio, in thousandths of full scale.
+
+    Args:
+        frame (bytes): input stream as bytes.
+
+    Returns:
+        float: rms of the input signal.
+    """
+    pcm = np.frombuffer(frame, dtype=np.int16)
+    if len(pcm) == 0:
+        return 0.0
+    samples = pcm.astype(np.float32) * np.float32(SHORT_NORMALIZE)
+    return float(np.sqrt(np.dot(samples, samples) / len(samples))) * 1000
+
+
+class VAD:
+    """Frame-level voice activity detector with a tracked noise floor.
+
+    The level of each frame is compared to an estimate of the background noise.
+    Speech starts when a frame is onset_db above the floor, and ends after
+    hangover_ms of frames less than offset_db above it, so short dips inside a
+    word do not end the speech. The floor follows the quietest frames
+    immediately and rises slowly, so it recovers from a lasting change of the
+    background noise without following the speech. Frames of digital silence,
+    from a muted or gated input, say nothing of the background and leave the
+    floor unchanged.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: float = 10.0,
+        onset_db: float = 10.0,
+        offset_db: float = 5.0,
+        hangover_ms: float = 150.0,
+        floor_rise_db: float = 3.0,
+        min_floor_db: float = -90.0,
+    ) -> None:
+        """Initialize the detector.
+
+        Args:
+            sample_rate (int): sample rate of the microphone.
+            frame_ms (float): Length of a frame in milliseconds. Defaults to 10.0.
+            onset_db (float): Level above the floor starting speech. Defaults to 10.0.
+            offset_db (float): Level above the floor under which speech may end.
+                Defaults to 5.0.
+            hangover_ms (float): Time under the offset level ending speech in
+                milliseconds. Defaults to 150.0.
+            floor_rise_db (float): Fastest rise of the noise floor in dB per second.
+                Defaults to 3.0.
+            min_floor_db (float): Level in dBFS at or under which a frame is
+                digital silence and does not update the noise floor.
+                Defaults to -90.0.
+        """
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.onset_db = onset_db
+        self.offset_db = offset_db
+        self.hangover_frames = max(1, int(round(hangover_ms / frame_ms)))
+        self._floor_rise = floor_rise_db * frame_ms / 1000
+        self.min_floor_db = min_floor_db
+        self.noise_floor_db: Optional[float] = None
+        self.is_speech = False
+        self._quiet_frames = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def reset(self) -> None:
+        """End the current speech, keeping the noise floor for the next response."""
+        self.is_speech = False
+        self._quiet_frames = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    def process(self, chunk: Union[bytes, np.ndarray]) -> bool:
+        """Update the detector with a chunk of the microphone stream.
+
+        Samples left over after the last whole frame are kept for the next chunk.
+
+        Args:
+            chunk (Union[bytes, np.ndarray]): 16 bit PCM bytes, or float samples in
+                [-1, 1].
+
+        Returns:
+            bool: Whether there is speech at the end of the chunk.
+        """
+        for level in self.frame_levels(chunk).tolist():
+            self._update(level)
+        return self.is_speech
+
+    def frame_levels(self, chunk: Union[bytes, np.ndarray]) -> np.ndarray:
+        """Get the level of every whole frame completed by a chunk.
+
+        Args:
+            chunk (Union[bytes, np.ndarray]): 16 bit PCM bytes, or float samples in
+                [-1, 1].
+
+        Returns:
+            np.ndarray: level of each frame in dBFS.
+        """
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+            samples *= np.float32(SHORT_NORMALIZE)
+        else:
+            samples = np.asarray(chunk, dtype=np.float32)
+        if len(self._remainder):
+            samples = np.concatenate((self._remainder, samples))
+
+        n_frames = len(samples) // self.frame_length
+        end = n_frames * self.frame_length
+        frames = samples[:end].reshape(n_frames, self.frame_length)
+        self._remainder = samples[end:].copy()
+        power = np.einsum("ij,ij->i", frames, frames) / self.frame_length
+        return 10 * np.log10(np.maximum(power, 1e-12))
+
+    def _update(self, level: float) -> None:
+        """Update the speech state and the noise floor with the level of a frame.
+
+        Args:
+            level (float): level of the frame in dBFS.
+        """
+        silent = level <= self.min_floor_db
+        if self.noise_floor_db is None:
+            if silent:
+                return
+            self.noise_floor_db = level
+
+        if not self.is_speech and level > self.noise_floor_db + self.onset_db:
+            self.is_speech = True
+            self._quiet_frames = 0
+        elif self.is_speech:
+            if level < self.noise_floor_db + self.offset_db:
+                self._quiet_frames += 1
+                if self._quiet_frames >= self.hangover_frames:
+                    self.is_speech = False
+            else:
+                self._quiet_frames = 0
+
+        if not silent:
+            self.noise_floor_db = min(level, self.noise_floor_db + self._floor_rise)
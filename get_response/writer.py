@@ -0,0 +1,164 @@
+"""Save the recorded responses in a background thread."""
+
+import os
+import queue
+import re
+import threading
+import wave
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+SUPPORTED_FORMATS = ("wav", "flac")
+
+
+class RecordingWriter:
+    """Write 16 bit mono recordings to numbered files off the critical path.
+
+    File names come from a counter started after the highest number already in
+    the directory, so naming does not list the directory on every write. Files
+    are written by one thread from a bounded queue and synced to disk in
+    batches of fsync_every files.
+    """
+
+    def __init__(
+        self,
+        save_dir: str,
+        sample_rate: int,
+        file_format: str = "wav",
+        queue_size: int = 8,
+        fsync_every: int = 5,
+    ) -> None:
+        """Initialize the counter and start the writer thread.
+
+        Args:
+            save_dir (str): Where to save the recordings.
+            sample_rate (int): Sample rate of the recordings.
+            file_format (str): "wav", or "flac" to compress with torchaudio.
+                Defaults to "wav".
+            queue_size (int): Recordings waiting to be written before submit
+                blocks. Defaults to 8.
+            fsync_every (int): Number of files synced to disk at once, 0 to leave
+                it to the operating system. Defaults to 5.
+
+        Raises:
+            NotImplementedError: If the format is not supported.
+        """
+        if file_format not in SUPPORTED_FORMATS:
+            raise NotImplementedError(f"Unsupported recording format: {file_format}")
+        self.save_dir = Path(save_dir)
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.file_format = file_format
+        self.fsync_every = fsync_every
+        self._counter = self._next_number()
+        self._unsynced: list[Path] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, recording: bytes) -> Future:
+        """Queue a recording to be written.
+
+        Args:
+            recording (bytes): 16 bit mono samples.
+
+        Returns:
+            Future: Completed with the path of the file once it is written.
+        """
+        path = self.save_dir / f"{self._counter}.{self.file_format}"
+        self._counter += 1
+        future: Future = Future()
+        if self._queue.full():
+            logger.warning("Recording writer is behind, waiting for the disk")
+        self._queue.put((path, recording, future))
+        return future
+
+    def flush(self) -> None:
+        """Wait until every queued recording is written and synced."""
+        self._queue.put(None)
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued recordings and stop the thread."""
+        self.flush()
+        self._queue.put(False)
+        self._thread.join()
+
+    def _next_number(self) -> int:
+        """Find the number following the recordings already in the directory.
+
+        Returns:
+            int: first free number.
+        """
+        matches = (re.fullmatch(r"(\d+)\.\w+", n) for n in os.listdir(self.save_dir))
+        numbers = [int(match.group(1)) for match in matches if match]
+        return max(numbers, default=-1) + 1
+
+    def _run(self) -> None:
+        """Write the queued recordings until the thread is stopped."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is False:
+                    return
+                if item is None:
+                    self._sync()
+                    continue
+                path, recording, future = item
+                try:
+                    self._write(path, recording)
+                except Exception as exc:
+                    logger.error(f"Failed to write {path}: {exc}")
+                    future.set_exception(exc)
+                    continue
+                logger.debug(f"Written to file: {path}")
+                future.set_result(str(path))
+                self._unsynced.append(path)
+                if self.fsync_every and len(self._unsynced) >= self.fsync_every:
+                    self._sync()
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path: Path, recording: bytes) -> None:
+        """Write one recording.
+
+        Args:
+            path (Path): Destination of the file.
+            recording (bytes): 16 bit mono samples.
+        """
+        if self.file_format == "flac":
+            import torch
+            import torchaudio
+
+            samples = np.frombuffer(recording, dtype=np.int16).astype(np.float32)
+            tensor = torch.from_numpy(samples / 32768).unsqueeze(0)
+            torchaudio.save(
+                str(path), tensor, self.sample_rate, format="flac", bits_per_sample=16
+            )
+            return
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(recording)
+
+    def _sync(self) -> None:
+        """Force the files written since the last sync and their entries to disk."""
+        if not self._unsynced:
+            return
+        for path in self._unsynced:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.save_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._unsynced = []
@@ -1,28 +1,31 @@
 """A module to manage and organize the test procedure."""
 
-import os
 from abc import ABC, abstractmethod
 from pathlib import Path
 
 from colorama import Fore
 from loguru import logger
-from pydub import AudioSegment
 
-from audio_processing.noise import Babble, WhiteNoise
-from get_response.asr import ASR, SimpleASR, SpeechBrainASR
+from audio_processing.devices import AudioBackend, set_backend
+from audio_processing.mixer import Mixer
+from audio_processing.noise import Noise
+from backends import ASRS, AUDIO_BACKENDS, NOISES, VOCALIZERS
+from get_response.asr import ASR
 from get_response.base import CaptureResponse
 from get_response.cli import CLI
-from get_response.recorder import Recorder
+from get_response.endpoint import Endpointer
 from hearing_test.test_logic import DigitInNoise
 from stimuli_generator.questions import DigitQuestions
-from vocalizer.vocalizer import TTS, Recorded, Vocalizer
-from nltk.stem import WordNetLemmatizer
-import nltk
+from vocalizer.cache import CachedVocalizer
+from vocalizer.vocalizer import Vocalizer
 
 
 class TestManager(ABC):
     """A class to create the hearing test based on config file."""
 
+    # Whether the response can only be captured once the stimuli has been played.
+    wait_for_playback = True
+
     def __init__(self, configs: dict) -> None:
         """Initialize the hearing test and other modules.
 
@@ -30,6 +33,12 @@ class TestManager(ABC):
             configs (dict): Path to the configuration file.
         """
         self.conf = configs
+        audio_conf = self.conf.get("audio", {})
+        self.sample_rate = audio_conf.get("output_sample_rate", 44100)
+        self.input_sample_rate = audio_conf.get("input_sample_rate", 44100)
+        # Players and microphone streams are opened on the configured devices.
+        self.audio_backend = self._get_audio_backend()
+        set_backend(self.audio_backend)
         self.hearing_test = DigitInNoise(
             correct_threshold=self.conf["test"]["correct_threshold"],
             incorrect_threshold=self.conf["test"]["incorrect_threshold"],
@@ -42,42 +51,134 @@ class TestManager(ABC):
 
         self.response_capturer = self._capture_method()
 
-        self.recorder = Recorder(
-            store=True,
-            chunk=1024,
-            rms_threshold=10,
-            timeout_length=3,
-            save_dir=configs["test"]["record_save_dir"],
-        )
+        # The noise may be shaped after the stimuli, so the vocalizer comes first.
+        self.sound_generator = self._get_sound_generator()
 
         self.noise = self._get_noise()
 
-        self.sound_generator = self._get_sound_generator()
+        self.mixer = Mixer(
+            self.noise,
+            sample_rate=self.sample_rate,
+            pre_padding=audio_conf.get("pre_padding_ms", 227) / 1000,
+            post_padding=audio_conf.get("post_padding_ms", 227) / 1000,
+            fade=audio_conf.get("fade_ms", 10) / 1000,
+        )
 
         self.start_snr = self.conf["test"]["start_snr"]
 
+    def _get_audio_backend(self) -> AudioBackend:
+        """Get the devices the stimuli are played and the responses captured on.
+
+        Returns:
+            AudioBackend: The sound card, or virtual devices for headless runs.
+        """
+        audio_conf = self.conf.get("audio", {})
+        name = audio_conf.get("backend", "hardware")
+        options = {}
+        if name == "virtual":
+            virtual_conf = audio_conf.get("virtual", {})
+            options = {
+                "responses_dir": virtual_conf.get("responses_dir"),
+                "output": virtual_conf.get("output"),
+                "speed": virtual_conf.get("speed", 1.0),
+                "response_delay": virtual_conf.get("response_delay_ms", 300) / 1000,
+            }
+        return AUDIO_BACKENDS.get(name)(**options)
+
     def _get_sound_generator(self) -> Vocalizer:
-        if self.conf["stimuli_vocalizer"]["name"] == "recorded":
-            return Recorded(Path(self.conf["stimuli_vocalizer"]["src"]))
-        elif self.conf["stimuli_vocalizer"]["name"] == "tts":
-            return TTS(device="cpu")
-        else:
-            raise NotImplementedError
+        """Get the proper vocalizer based on config file.
 
-    def _get_noise(self):
-        """Get the proper noise generator based on config file.
+        Only the module of the configured vocalizer is imported, and models are
+        loaded on first use.
+
+        Returns:
+            Vocalizer: The vocalizer, wrapped in a cache if enabled in the config.
+        """
+        name = self.conf["stimuli_vocalizer"]["name"]
+        vocalizer = VOCALIZERS.get(name)(**self._vocalizer_options(name))
+        # A pre-rendered corpus is already a store, caching it would only copy it.
+        if name == "prerendered":
+            return vocalizer
+
+        cache_conf = self.conf["stimuli_vocalizer"].get("cache", {})
+        if cache_conf.get("enabled", False):
+            return CachedVocalizer(
+                vocalizer,
+                cache_dir=Path(cache_conf["dir"]),
+                max_memory_bytes=int(cache_conf["memory_mb"] * 2**20),
+            )
+        return vocalizer
+
+    def _vocalizer_options(self, name: str) -> dict:
+        """Get the arguments of the vocalizer from the config file.
 
-        Raises:
-            NotImplementedError: If the noise type is not implemented.
+        Args:
+            name (str): Name of the vocalizer.
+
+        Returns:
+            dict: Keyword arguments of the vocalizer class.
+        """
+        vocalizer_conf = self.conf["stimuli_vocalizer"]
+        if name == "recorded":
+            prepend = vocalizer_conf.get("prepend")
+            return {
+                "src": Path(vocalizer_conf["src"]),
+                "prepend_src": Path(prepend) if prepend else None,
+                "digit_gap": vocalizer_conf.get("digit_gap_ms", 0) / 1000,
+            }
+        elif name == "tts":
+            return {
+                "device": "cpu",
+                "mode": vocalizer_conf.get("tts_mode", "full"),
+                "crossfade": vocalizer_conf.get("crossfade_ms", 10) / 1000,
+                "fast_inference": vocalizer_conf.get("fast_inference", False),
+                "threads": vocalizer_conf.get("threads"),
+                "interop_threads": vocalizer_conf.get("interop_threads"),
+            }
+        elif name == "prerendered":
+            return {"src": Path(vocalizer_conf["corpus"])}
+        return {}
+
+    def _get_noise(self) -> Noise:
+        """Get the proper noise generator based on config file.
 
         Returns:
             Noise: The noise generator.
         """
-        if self.conf["test"]["noise"]["type"] == "white":
-            return WhiteNoise()
-        elif self.conf["test"]["noise"]["type"] == "babble":
-            return Babble(noise_src=self.conf["test"]["noise"]["src"])
-        raise NotImplementedError
+        noise_conf = self.conf["test"]["noise"]
+        options = {"seed": noise_conf.get("seed")}
+        if noise_conf["type"] == "white":
+            options["refill"] = noise_conf.get("refill", True)
+        elif noise_conf["type"] == "babble":
+            options["noise_src"] = noise_conf["src"]
+            options["sample_rate"] = self.sample_rate
+        elif noise_conf["type"] == "streamed":
+            options["noise_src"] = noise_conf["src"]
+            options["sample_rate"] = self.sample_rate
+            options["cache_dir"] = noise_conf.get("cache_dir", "models/noise_cache")
+        elif noise_conf["type"] == "multitalker":
+            options["talkers_dir"] = noise_conf["talkers_dir"]
+            options["n_talkers"] = noise_conf.get("n_talkers", 4)
+            options["sample_rate"] = self.sample_rate
+        elif noise_conf["type"] == "speech_shaped":
+            stimuli = self.stimuli_generator.all_stimuli()
+            step = max(1, len(stimuli) // noise_conf.get("spectrum_stimuli", 50))
+            options["vocalizer"] = self.sound_generator
+            options["texts"] = stimuli[::step]
+            options["sample_rate"] = self.sample_rate
+            options["cache_dir"] = noise_conf.get("cache_dir", "models/noise_cache")
+        return NOISES.get(noise_conf["type"])(**options)
+
+    def warm_up(self) -> None:
+        """Load the models of the vocalizer and response capturer in the background."""
+        self.sound_generator.warm_up()
+        self.response_capturer.warm_up()
+
+    def close(self) -> None:
+        """Release the audio devices and the noise files held by the test."""
+        if hasattr(self.noise, "close"):
+            self.noise.close()
+        self.audio_backend.close()
 
     @abstractmethod
     def get_response(self) -> list[str]:
@@ -101,6 +202,8 @@ class TestManager(ABC):
 class CliTestManager(TestManager):
     """Test manager for command line test."""
 
+    wait_for_playback = False
+
     def __init__(self, configs: dict) -> None:
         """Initialize the command line test manager.
 
@@ -150,42 +253,100 @@ class CliTestManager(TestManager):
 class ASRTestManager(TestManager):
     """Test manager for ASR test."""
 
+    response_capturer: ASR
+
     def __init__(self, configs: dict) -> None:
         """Initialize the ASR test manager.
 
         Args:
             configs (dict): Loaded configuration.
         """
+        from pydub import AudioSegment
+
+        from get_response.recorder import Recorder
+        from get_response.streaming import StreamingRecognizer
+        from get_response.vad import VAD
+
         super().__init__(configs)
+        recorder_conf = configs.get("recorder", {})
+        self.recorder = Recorder(
+            store=True,
+            chunk=recorder_conf.get("chunk", 1024),
+            timeout_length=recorder_conf.get("timeout_s", 3),
+            save_dir=configs["test"]["record_save_dir"],
+            sample_rate=self.input_sample_rate,
+            vad=VAD(self.input_sample_rate, **recorder_conf.get("vad", {})),
+            pre_roll=recorder_conf.get("pre_roll_ms", 300) / 1000,
+            buffer_seconds=recorder_conf.get("buffer_s", 30),
+            file_format=recorder_conf.get("format", "wav"),
+            fsync_every=recorder_conf.get("fsync_every", 5),
+            endpointer=self._get_endpointer(recorder_conf),
+        )
+        self.streaming = (
+            StreamingRecognizer(self.response_capturer, self.input_sample_rate)
+            if configs["ml"].get("streaming", False)
+            else None
+        )
         self._prepend = AudioSegment.from_wav(configs["test"]["Prepend_wav_file"])
         self._prepend_len = configs["test"]["prepend_str_len"]
         self._lemmatizer = self._get_lemmatizer()
 
+    def _get_endpointer(self, recorder_conf: dict) -> Endpointer:
+        """Create the endpointer of the responses from the config.
+
+        Args:
+            recorder_conf (dict): recorder section of the config.
+
+        Returns:
+            Endpointer: The endpointer.
+        """
+        conf = recorder_conf.get("endpoint", {})
+        return Endpointer(
+            timeout=recorder_conf.get("timeout_s", 3),
+            n_segments=conf.get("digits", 3),
+            min_segment=conf.get("min_segment_ms", 100) / 1000,
+            min_hangover=conf.get("min_hangover_ms", 300) / 1000,
+            hangover_factor=conf.get("hangover_factor", 2.0),
+            max_duration=conf.get("max_s", 10),
+        )
+
     def _get_lemmatizer(self):
+        import nltk
+        from nltk.stem import WordNetLemmatizer
+
         nltk.download("wordnet")
         lemmatizer = WordNetLemmatizer()
         return lemmatizer
 
-    def _capture_method(self) -> CaptureResponse:
+    def _capture_method(self) -> ASR:
         return self.get_asr()
 
+    def warm_up(self) -> None:
+        """Load the models and start capturing the microphone."""
+        super().warm_up()
+        self.recorder.capture.start()
+
+    def close(self) -> None:
+        """Stop capturing the microphone and the streaming recognition."""
+        self.recorder.close()
+        if self.streaming is not None:
+            self.streaming.close()
+        super().close()
+
     def get_asr(self) -> ASR:
         """Get the proper asr engine based on config file.
 
-        Raises:
-            NotImplementedError: If the asr type is not implemented.
-
         Returns:
             ASR: The asr engine.
         """
-        if self.conf["ml"]["asr_type"] == "SpeechBrain":
-            return SpeechBrainASR(
-                source=self.conf["ml"]["asr_source"],
-                save_dir=self.conf["ml"]["asr_save_dir"],
-            )
-        elif self.conf["ml"]["asr_type"] == "SimpleASR":
-            return SimpleASR()
-        raise NotImplementedError
+        asr_type = self.conf["ml"]["asr_type"]
+        options = {}
+        if asr_type == "SpeechBrain":
+            options = {
+                "source": self.conf["ml"]["asr_source"],
+                "save_dir": self.conf["ml"]["asr_save_dir"],
+            }
+        return ASRS.get(asr_type)(**options)
 
     def _post_process(self, responses: list[str]) -> list[str]:
         """Post process the transcribe and remove common mistakes.
@@ -279,14 +440,20 @@ class ASRTestManager(TestManager):
 
         print(Fore.GREEN + "Repeat the numbers you heard")
 
-        file_src = self.recorder.listen()
-
-        transcribe = self.response_capturer.get(src=file_src).lower()
+        transcribe = ""
+        if self.streaming is None:
+            recording = self.recorder.listen()
+        else:
+            self.streaming.reset()
+            recording = self.recorder.listen(on_segment=self.streaming.add)
+            transcribe = self.streaming.result()
+        if not transcribe:
+            # The segments missed the response, transcribe the whole recording.
+            transcribe = self.response_capturer.get(
+                audio=recording.audio, sample_rate=recording.sample_rate
+            )
+        transcribe = transcribe.lower()
         logger.debug(transcribe)
         results = self._post_process(transcribe.split(" "))
         logger.debug(results)
-        try:
-            os.remove(file_src.split("/")[-1])
-        except FileNotFoundError:
-            logger.debug("file not found")
         return results
@@ -2,11 +2,13 @@
 
 import os
 import sys
+import time
 
 from colorama import Fore
 from loguru import logger
 
-from util import get_test_manager, play_stimuli, read_conf
+from util import get_prefetcher, get_test_manager, read_conf, run_test
+from vocalizer.utils import close_players
 
 logger.remove(0)
 logger.add(sys.stderr, level="INFO")
@@ -56,41 +58,19 @@ def main():
 
     configs = read_configs(save_dir, test_number, response_capturing_mode)
 
+    start = time.perf_counter()
     manager = get_test_manager(configs)
-
-    snr_db = manager.start_snr
-    correct_count = incorrect_count = 0
-    iteration = 1
-    while not manager.hearing_test.stop_condition():
-        print(Fore.RED + "Press Enter to play the next digits")
-        input()
-        question = manager.stimuli_generator.get_stimuli()
-        print(Fore.YELLOW + "Listen to the numbers")
-        logger.debug(f"{iteration} :The stimuli is: {question}")
-        play_stimuli(manager.sound_generator, snr_db, question, manager.noise)
-
-        transcribe = manager.get_response()
-
-        matched = manager.stimuli_generator.check_answer(transcribe)
-        logger.debug(f"Matched: {matched}")
-
-        if matched:
-            correct_count += 1
-        else:
-            incorrect_count += 1
-
-        new_snr_db = manager.hearing_test.get_next_snr(
-            correct_count, incorrect_count, snr_db
-        )
-        manager.hearing_test.update_variables(matched, snr_db)
-        logger.debug(f"New SNR: {new_snr_db}")
-        if new_snr_db != snr_db:
-            snr_db = new_snr_db
-            correct_count = incorrect_count = 0
-        iteration += 1
-
-    logger.debug(f"Final SRT: {manager.hearing_test.srt} \n")
-    print(Fore.RED + "End of the test")
+    logger.info(f"Test manager ready in {time.perf_counter() - start:.2f}s")
+    if configs.get("startup", {}).get("warm_up", False):
+        manager.warm_up()
+    prefetcher = get_prefetcher(manager, configs)
+    prefetcher.start()
+    try:
+        run_test(manager, prefetcher, start)
+    finally:
+        prefetcher.stop()
+        close_players()
+        manager.close()
 
 
 if __name__ == "__main__":
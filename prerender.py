@@ -0,0 +1,139 @@
+"""Render every digit-triplet stimuli once and store them in a corpus file."""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from stimuli_generator.questions import DigitQuestions
+from vocalizer.corpus import SUPPORTED_DTYPES, write_corpus
+from vocalizer.vocalizer import TTS
+
+logger.remove(0)
+logger.add(sys.stderr, level="INFO")
+
+_worker_tts: Optional[TTS] = None
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, default=Path("media/DIN/corpus.bin"))
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32")
+    parser.add_argument("--device", default="cpu")
+    return parser.parse_args()
+
+
+def _init_worker(device: str, threads: int) -> None:
+    """Load the TTS models once in a worker process.
+
+    Args:
+        device (str): device to run the models on.
+        threads (int): number of torch threads of the worker.
+    """
+    import torch
+
+    global _worker_tts
+    torch.set_num_threads(threads)
+    _worker_tts = TTS(device=device)
+
+
+def _render_batch(texts: list[str]) -> list[np.ndarray]:
+    """Render one batch of stimuli in a worker process.
+
+    Args:
+        texts (list[str]): stimuli of the batch.
+
+    Raises:
+        RuntimeError: If the worker was not initialized with _init_worker.
+
+    Returns:
+        list[np.ndarray]: waveform of each stimuli.
+    """
+    if _worker_tts is None:
+        raise RuntimeError("The TTS of the worker is not loaded")
+    return _worker_tts.get_sounds(texts)
+
+
+def make_batches(texts: list[str], batch_size: int) -> list[list[str]]:
+    """Split the stimuli into batches of similar length.
+
+    Sorting by length keeps the padding inside each batch small.
+
+    Args:
+        texts (list[str]): stimuli to render.
+        batch_size (int): Maximum number of stimuli in a batch.
+
+    Returns:
+        list[list[str]]: The batches, longest stimuli first.
+    """
+    ordered = sorted(texts, key=len, reverse=True)
+    return [
+        ordered[start : start + batch_size]
+        for start in range(0, len(ordered), batch_size)
+    ]
+
+
+def render(
+    texts: list[str], batch_size: int, workers: int, device: str
+) -> dict[str, np.ndarray]:
+    """Render the stimuli with batched TTS calls spread over worker processes.
+
+    Args:
+        texts (list[str]): stimuli to render.
+        batch_size (int): Number of stimuli synthesized together.
+        workers (int): Number of worker processes, each with its own models.
+        device (str): device to run the models on.
+
+    Returns:
+        dict[str, np.ndarray]: waveform of each stimuli.
+    """
+    batches = make_batches(texts, batch_size)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    sounds: dict[str, np.ndarray] = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(device, threads),
+    ) as executor:
+        for batch, batch_sounds in zip(batches, executor.map(_render_batch, batches)):
+            sounds.update(zip(batch, batch_sounds))
+            logger.info(f"Rendered {len(sounds)}/{len(texts)} stimuli")
+    return sounds
+
+
+def main():
+    """Code entry point."""
+    args = parse_args()
+    texts = DigitQuestions().all_stimuli()
+
+    start = time.perf_counter()
+    sounds = render(texts, args.batch_size, args.workers, args.device)
+    logger.info(f"Rendered {len(sounds)} stimuli in {time.perf_counter() - start:.1f}s")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    write_corpus(
+        args.output,
+        {text: sounds[text] for text in texts},
+        sample_rate=TTS.sample_rate,
+        dtype=args.dtype,
+    )
+    logger.info(f"Corpus written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
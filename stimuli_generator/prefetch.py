@@ -0,0 +1,127 @@
+"""Prepare the next stimuli in the background while the current trial runs."""
+
+import queue
+import threading
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+from loguru import logger
+
+from audio_processing.resample import resample
+from stimuli_generator.questions import Questions
+from vocalizer.vocalizer import Vocalizer
+
+
+class PreparedStimuli(NamedTuple):
+    """A stimuli with its clean speech waveform."""
+
+    question: str
+    main_words: list[str]
+    sound: np.ndarray
+    sample_rate: int
+
+
+class StimuliPrefetcher:
+    """Generate and vocalize upcoming stimuli in a background thread.
+
+    Only the clean speech is prepared ahead of time, the SNR of a trial depends on
+    the previous answer so the noise is mixed at play time.
+    """
+
+    def __init__(
+        self,
+        questions: Questions,
+        vocalizer: Vocalizer,
+        depth: int = 2,
+        sample_rate: Optional[int] = None,
+    ):
+        """Initialize the prefetcher.
+
+        Args:
+            questions (Questions): Generator of the stimuli, owned by the prefetcher.
+            vocalizer (Vocalizer): object to generate sound of the stimuli.
+            depth (int): How many stimuli to prepare ahead. With 0 the stimuli are
+                prepared on request in the calling thread. Defaults to 2.
+            sample_rate (Optional[int]): Rate to resample the sound to. Defaults to
+                None, the rate of the vocalizer.
+        """
+        self._questions = questions
+        self._vocalizer = vocalizer
+        self._depth = depth
+        self._sample_rate = sample_rate
+        self._queue: queue.Queue[Union[PreparedStimuli, BaseException]] = queue.Queue(
+            maxsize=max(depth, 1)
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start preparing stimuli in the background."""
+        if self._depth == 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._produce, name="stimuli-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def get(self) -> PreparedStimuli:
+        """Get the next stimuli, waiting for it if it is not ready yet.
+
+        Raises:
+            BaseException: Any error raised while preparing the stimuli.
+
+        Returns:
+            PreparedStimuli: The next stimuli and its sound.
+
+        # noqa: DAR401 item
+        # noqa: DAR402 BaseException
+        """
+        if self._thread is None:
+            return self._prepare()
+        item = self._queue.get()
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def stop(self) -> None:
+        """Stop the background thread and drop the prepared stimuli."""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _prepare(self) -> PreparedStimuli:
+        """Generate one stimuli and its sound.
+
+        Returns:
+            PreparedStimuli: The stimuli and its sound.
+        """
+        question = self._questions.get_stimuli()
+        sound = self._vocalizer.get_sound(question)
+        sample_rate = self._sample_rate or self._vocalizer.sample_rate
+        sound = resample(sound, self._vocalizer.sample_rate, sample_rate)
+        return PreparedStimuli(
+            question, list(self._questions.main_words), sound, sample_rate
+        )
+
+    def _produce(self) -> None:
+        """Keep the queue full until stopped."""
+        while not self._stop.is_set():
+            try:
+                item: Union[PreparedStimuli, BaseException] = self._prepare()
+            except Exception as exc:
+                logger.error(f"Error while preparing the stimuli: {exc}")
+                item = exc
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if isinstance(item, BaseException):
+                return
@@ -1,5 +1,6 @@
 """Module for storing question and their validation method."""
 
+import itertools
 import random
 from abc import ABC, abstractmethod
 
@@ -33,6 +34,16 @@ class Questions(ABC):
         """
         pass
 
+    def set_stimuli(self, question: str, main_words: list[str]) -> None:
+        """Make a stimuli generated by another object the current question.
+
+        Args:
+            question (str): stimuli for the question.
+            main_words (list[str]): words the answer is checked against.
+        """
+        self.question = question
+        self.main_words = list(main_words)
+
 
 class DigitQuestions(Questions):
     """Class for modeling digit-in-noise test questions."""
@@ -63,9 +74,31 @@ class DigitQuestions(Questions):
             str: stimuli for the question.
         """
         self.main_words = random.sample(self.vocab_list, 3)
-        self.question = "The number is " + " ".join(self.main_words)
+        self.question = self._to_question(self.main_words)
         return self.question
 
+    def all_stimuli(self) -> list[str]:
+        """Enumerate every stimuli that get_stimuli can generate.
+
+        Returns:
+            list[str]: All the stimuli, one for each ordered triplet of distinct digits.
+        """
+        return [
+            self._to_question(list(words))
+            for words in itertools.permutations(self.vocab_list, 3)
+        ]
+
+    def _to_question(self, words: list[str]) -> str:
+        """Build the stimuli sentence from the digits.
+
+        Args:
+            words (list[str]): The digits of the stimuli.
+
+        Returns:
+            str: stimuli for the question.
+        """
+        return "The number is " + " ".join(words)
+
     def check_answer(self, answer: list[str]) -> bool:
         """Check the given number is the same as the one  presented to the patient.
 
@@ -0,0 +1,30 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from get_response.asr import ASR
+
+
+class FakeASR(ASR):
+    def _transcribe(self, src):
+        return f"file {src}"
+
+    def _transcribe_audio(self, audio, sample_rate):
+        return f"{len(audio)} samples at {sample_rate}"
+
+
+class Test_ASR:
+    def test_file(self):
+        assert FakeASR().get(src="0.wav") == "file 0.wav"
+
+    def test_audio_in_memory(self):
+        audio = np.zeros(160, dtype=np.int16)
+        assert FakeASR().get(audio=audio, sample_rate=16000) == "160 samples at 16000"
+
+    def test_audio_without_sample_rate(self):
+        with pytest.raises(ValueError):
+            FakeASR().get(audio=np.zeros(10, dtype=np.int16))
+
+    def test_nothing_to_transcribe(self):
+        with pytest.raises(ValueError):
+            FakeASR().get()
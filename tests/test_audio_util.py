@@ -0,0 +1,97 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from audio_processing.resample import resample
+from audio_processing.util import (
+    calculate_db_spl,
+    chunked_rms_amplitude,
+    convert_to_specific_db_spl,
+    convert_to_specific_rms,
+    crossfade_concat,
+    rms_amplitude,
+    trim_silence,
+)
+
+
+class Test_Splicing:
+    def test_trim_silence(self):
+        signal = np.concatenate([np.zeros(10), np.ones(5), np.zeros(10)])
+        assert len(trim_silence(signal)) == 5
+
+    def test_trim_all_silent(self):
+        assert len(trim_silence(np.zeros(10))) == 0
+
+    def test_crossfade_keeps_level(self):
+        segments = [np.ones(100, np.float32), np.ones(50, np.float32)]
+        spliced = crossfade_concat(segments, overlap=20)
+        assert len(spliced) == 130
+        np.testing.assert_allclose(spliced, 1, rtol=1e-6)
+
+    def test_crossfade_without_overlap(self):
+        segments = [np.ones(3), np.zeros(2)]
+        np.testing.assert_array_equal(crossfade_concat(segments, 0), [1, 1, 1, 0, 0])
+
+    def test_overlap_limited_to_shortest(self):
+        assert len(crossfade_concat([np.ones(100), np.ones(5)], 20)) == 100
+
+
+class Test_Resample:
+    def test_same_rate_is_identity(self):
+        signal = np.ones(10, np.float32)
+        assert resample(signal, 22050, 22050) is signal
+
+    def test_keeps_float32_and_frequency(self):
+        t = np.arange(22050) / 22050
+        signal = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+        resampled = resample(signal, 22050, 44100)
+        assert resampled.dtype == np.float32
+        assert len(resampled) == 44100
+        spectrum = np.abs(np.fft.rfft(resampled))
+        assert np.argmax(spectrum) == 1000
+
+    def test_integer_input(self):
+        assert resample(np.zeros(441, np.int16), 44100, 22050).dtype == np.float32
+
+
+class Test_BatchedLevels:
+    def test_rms_along_axis(self):
+        signals = np.array([[1, -1, 1, -1], [2, -2, 2, -2]], dtype=np.float32)
+        rms = rms_amplitude(signals, axis=1)
+        assert rms.shape == (2, 1)
+        assert rms.dtype == np.float32
+        np.testing.assert_allclose(rms[:, 0], [1, 2])
+
+    def test_chunked_rms_of_multichannel_signal(self):
+        signal = np.random.default_rng(0).normal(size=(1000, 2)) * 1000
+        signal = signal.astype(np.int16)
+        chunked = chunked_rms_amplitude(signal, chunk_size=64)
+        assert chunked == pytest.approx(rms_amplitude(signal))
+
+    def test_integer_signal_does_not_overflow(self):
+        signal = np.full(10, 30000, dtype=np.int16)
+        assert rms_amplitude(signal) == pytest.approx(30000)
+
+    def test_many_signals_to_one_level(self):
+        signals = np.random.default_rng(0).normal(size=(3, 1000)).astype(np.float32)
+        scaled = convert_to_specific_db_spl(signals, 65, axis=1)
+        assert scaled.dtype == np.float32
+        np.testing.assert_allclose(calculate_db_spl(scaled, axis=1), 65, atol=1e-3)
+
+    def test_one_signal_to_many_levels(self):
+        signal = np.random.default_rng(0).normal(size=1000)
+        scaled = convert_to_specific_db_spl(signal, np.array([[50], [60], [70]]))
+        assert scaled.shape == (3, 1000)
+        np.testing.assert_allclose(calculate_db_spl(scaled, axis=1)[:, 0], [50, 60, 70])
+
+    def test_inplace(self):
+        signals = np.ones((2, 100), dtype=np.float32)
+        result = convert_to_specific_rms(
+            signals, np.array([[0.5], [2.0]]), axis=1, inplace=True
+        )
+        assert result is signals
+        np.testing.assert_allclose(signals[:, 0], [0.5, 2.0])
+
+    def test_inplace_to_many_levels_fails(self):
+        with pytest.raises(ValueError):
+            convert_to_specific_rms(np.ones(10), np.array([[1.0], [2.0]]), inplace=True)
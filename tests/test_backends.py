@@ -0,0 +1,36 @@
+# flake8: noqa
+import subprocess
+import sys
+
+import pytest
+
+from backends import VOCALIZERS, Lazy, Registry
+
+
+def test_registry_imports_on_get():
+    assert VOCALIZERS.get("recorded").__name__ == "Recorded"
+
+
+def test_registry_unknown_backend():
+    with pytest.raises(NotImplementedError):
+        Registry("noise").get("pink")
+
+
+def test_lazy_creates_once():
+    calls = []
+    lazy = Lazy(lambda: calls.append(1) or "model")
+    assert not lazy.loaded
+    assert lazy.get() == "model"
+    assert lazy.get() == "model"
+    assert calls == [1]
+
+
+def test_util_does_not_import_models():
+    code = (
+        "import sys, util; "
+        "print(any(m in sys.modules for m in ('tensorflow', 'speechbrain', 'torch')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,136 @@
+# flake8: noqa
+import threading
+import time
+
+import numpy as np
+from scipy.io import wavfile
+
+from get_response.capture import CaptureStream
+from get_response.recorder import Recorder
+from get_response.vad import VAD
+
+RATE = 8000
+CHUNK = 80
+
+
+class FakeInput:
+    """Stand-in for an input stream that feeds the capture in a thread."""
+
+    def __init__(self, capture, signal):
+        self.capture = capture
+        self.signal = signal
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for start in range(0, len(self.signal), CHUNK):
+            if not self._running:
+                return
+            chunk = self.signal[start : start + CHUNK]
+            self.capture._callback(chunk.tobytes(), len(chunk), None, 0)
+            time.sleep(0.0005)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+    def close(self):
+        pass
+
+
+def make_signal(onsets=(1.0,), seconds=3):
+    rng = np.random.default_rng(0)
+    signal = rng.normal(scale=30, size=RATE * seconds)
+    t = np.arange(RATE // 2) / RATE
+    for onset in onsets:
+        start = int(onset * RATE)
+        signal[start : start + RATE // 2] += 8000 * np.sin(2 * np.pi * 300 * t)
+    return signal.astype(np.int16)
+
+
+def make_recorder(tmp_path, timeout_length=1.2):
+    return Recorder(
+        store=True,
+        chunk=CHUNK,
+        timeout_length=timeout_length,
+        save_dir=str(tmp_path),
+        sample_rate=RATE,
+        vad=VAD(RATE),
+        pre_roll=0.1,
+    )
+
+
+class Test_CaptureStream:
+    def test_read_across_the_wrap(self):
+        capture = CaptureStream(sample_rate=100, chunk=30, buffer_seconds=1.0)
+        data = np.arange(250, dtype=np.int16)
+        for start in range(0, 250, 30):
+            chunk = data[start : start + 30]
+            capture._callback(chunk.tobytes(), len(chunk), None, 0)
+        assert capture.position == 250
+        assert capture.oldest == 150
+        np.testing.assert_array_equal(capture.read(180, 240), data[180:240])
+
+    def test_overwritten_frames_are_skipped(self):
+        capture = CaptureStream(sample_rate=100, chunk=50, buffer_seconds=1.0)
+        data = np.arange(300, dtype=np.int16)
+        capture._callback(data.tobytes(), 300, None, 0)
+        np.testing.assert_array_equal(capture.read(0, 300), data[200:])
+        assert capture.overruns == 200
+
+    def test_wait_for_new_frames(self):
+        capture = CaptureStream(sample_rate=RATE, chunk=CHUNK)
+        assert not capture.wait(0, timeout=0.01)
+        capture._stream = FakeInput(capture, np.zeros(RATE, dtype=np.int16))
+        assert capture.wait(0, timeout=1)
+        capture.close()
+
+
+class Test_Recorder:
+    def test_records_speech_with_pre_roll(self, tmp_path):
+        recorder = make_recorder(tmp_path)
+        signal = make_signal()
+        recorder.capture._stream = FakeInput(recorder.capture, signal)
+        recording = recorder.record()
+        rate, saved = wavfile.read(recording.saved.result())
+        recorder.close()
+        np.testing.assert_array_equal(saved, recording.audio)
+        recording = recording.audio
+
+        assert rate == RATE
+        # The recording starts 0.1s before the speech and ends 1.2s after the
+        # end of speech detected by the VAD, 0.15s after the tone.
+        start = RATE - RATE // 10
+        expected = int((0.1 + 0.5 + 0.15 + 1.2) * RATE)
+        assert abs(len(recording) - expected) <= 2 * CHUNK
+        np.testing.assert_array_equal(recording[:100], signal[start : start + 100])
+
+    def test_without_speech_keeps_audio_from_the_call(self, tmp_path):
+        recorder = make_recorder(tmp_path, timeout_length=0.5)
+        # The tail of the stimulus, captured just before the call.
+        stimulus = make_signal(onsets=(0.5,), seconds=1)
+        recorder.capture._callback(stimulus.tobytes(), len(stimulus), None, 0)
+        signal = make_signal(onsets=(), seconds=2)
+        recorder.capture._stream = FakeInput(recorder.capture, signal)
+        recording = recorder.record()
+        recorder.close()
+
+        assert np.abs(recording.audio).max() < 1000
+        assert len(recording.audio) <= RATE // 2 + 2 * CHUNK
+
+    def test_speech_segments_are_emitted(self, tmp_path):
+        recorder = make_recorder(tmp_path)
+        signal = make_signal(onsets=(0.5, 1.5, 2.5), seconds=5)
+        recorder.capture._stream = FakeInput(recorder.capture, signal)
+        segments = []
+        recording = recorder.record(on_segment=segments.append)
+        recorder.close()
+
+        assert len(segments) == 3
+        for segment in segments:
+            # pre-roll, the tone and the VAD hangover
+            assert abs(len(segment) - int(0.75 * RATE)) <= 2 * CHUNK
+        assert sum(len(segment) for segment in segments) < len(recording.audio)
+        # Three digits end the response without waiting for the 1.2s timeout.
+        assert len(recording.audio) < (3.0 + 0.15 + 0.3 + 0.2 - 0.4) * RATE
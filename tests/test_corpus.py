@@ -0,0 +1,80 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from vocalizer.corpus import ALIGNMENT, read_header, write_corpus
+from vocalizer.vocalizer import Prerendered
+
+
+@pytest.fixture()
+def sounds():
+    return {
+        "The number is one two three": np.linspace(-0.5, 0.5, 100),
+        "The number is four five six": np.linspace(0.1, 0.2, 50),
+    }
+
+
+class Test_Corpus:
+    def test_float32_round_trip(self, tmp_path, sounds):
+        path = tmp_path / "corpus.bin"
+        write_corpus(path, sounds, sample_rate=22050)
+        header, data_offset = read_header(path)
+        assert header["sample_rate"] == 22050
+        assert data_offset % ALIGNMENT == 0
+        samples = np.fromfile(path, dtype="<f4", offset=data_offset)
+        for text, sound in sounds.items():
+            offset, length = header["index"][text]
+            np.testing.assert_allclose(
+                samples[offset : offset + length], sound, rtol=1e-6
+            )
+
+    def test_int16_round_trip(self, tmp_path, sounds):
+        path = tmp_path / "corpus.bin"
+        write_corpus(path, sounds, sample_rate=22050, dtype="int16")
+        header, data_offset = read_header(path)
+        samples = np.fromfile(path, dtype="<i2", offset=data_offset)
+        offset, length = header["index"]["The number is one two three"]
+        restored = samples[offset : offset + length] * header["scale"]
+        np.testing.assert_allclose(
+            restored, sounds["The number is one two three"], atol=1e-4
+        )
+
+    def test_invalid_dtype(self, tmp_path, sounds):
+        with pytest.raises(ValueError):
+            write_corpus(tmp_path / "corpus.bin", sounds, 22050, dtype="float64")
+
+    def test_not_a_corpus(self, tmp_path):
+        path = tmp_path / "corpus.bin"
+        path.write_bytes(b"RIFF0000WAVE")
+        with pytest.raises(ValueError):
+            read_header(path)
+
+
+class Test_Prerendered:
+    def test_zero_copy_view(self, tmp_path, sounds):
+        path = tmp_path / "corpus.bin"
+        write_corpus(path, sounds, sample_rate=22050)
+        vocalizer = Prerendered(path)
+        sound = vocalizer.get_sound("The number is four five six")
+        assert vocalizer.sample_rate == 22050
+        assert sound.dtype == np.float32
+        assert not sound.flags.writeable
+        assert isinstance(sound.base, np.memmap) or isinstance(sound, np.memmap)
+        np.testing.assert_allclose(
+            sound, sounds["The number is four five six"], rtol=1e-6
+        )
+
+    def test_triplet_lookup(self, tmp_path, sounds):
+        path = tmp_path / "corpus.bin"
+        write_corpus(path, sounds, sample_rate=22050, dtype="int16")
+        sound = Prerendered(path).get_sound("one two three")
+        assert sound.dtype == np.float32
+        np.testing.assert_allclose(
+            sound, sounds["The number is one two three"], atol=1e-4
+        )
+
+    def test_missing_stimuli(self, tmp_path, sounds):
+        path = tmp_path / "corpus.bin"
+        write_corpus(path, sounds, sample_rate=22050)
+        with pytest.raises(KeyError):
+            Prerendered(path).get_sound("The number is seven eight nine")
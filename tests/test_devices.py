@@ -0,0 +1,137 @@
+# flake8: noqa
+import time
+
+import numpy as np
+import pytest
+from loguru import logger
+from scipy.io import wavfile
+
+from audio_processing.devices import VirtualBackend
+from get_response.capture import CaptureStream
+from get_response.endpoint import Endpointer
+from get_response.recorder import Recorder
+from get_response.vad import VAD
+from vocalizer.player import StreamPlayer
+
+RATE = 8000
+
+
+def make_digits(path, seconds=0.4, gap=0.3):
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = np.sin(2 * np.pi * 300 * t) * 10000
+    silence = np.zeros(int(gap * RATE))
+    response = np.concatenate([silence, tone, silence, tone, silence, tone, silence])
+    wavfile.write(path, RATE, response.astype(np.int16))
+
+
+def make_response(path, seconds=0.5):
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = (np.sin(2 * np.pi * 300 * t) * 10000).astype(np.int16)
+    wavfile.write(path, RATE, tone)
+    return tone
+
+
+class Test_VirtualBackend:
+    def test_output_keeps_what_is_played(self, tmp_path):
+        output = tmp_path / "played.wav"
+        backend = VirtualBackend(output=str(output), speed=10)
+        player = StreamPlayer(sample_rate=RATE, block_size=80, backend=backend)
+        wave = np.linspace(0.1, 0.5, RATE // 2, dtype=np.float32)
+        player.play(wave).result(timeout=5)
+        player.close()
+        backend.close()
+
+        played = backend.played[backend.played != 0]
+        np.testing.assert_array_equal(played, wave)
+        rate, saved = wavfile.read(output)
+        assert rate == RATE
+        assert len(saved) == len(backend.played)
+        np.testing.assert_allclose(saved / 32768, backend.played, atol=1 / 32768)
+
+    def test_keeps_only_the_last_seconds(self):
+        backend = VirtualBackend(speed=10, keep_seconds=0.1)
+        player = StreamPlayer(sample_rate=RATE, block_size=80, backend=backend)
+        player.play(np.full(RATE // 2, 0.5, dtype=np.float32)).result(timeout=5)
+        player.close()
+        assert RATE // 10 <= len(backend.played) < RATE // 10 + 80
+
+    def test_input_answers_each_playback(self, tmp_path):
+        tone = make_response(tmp_path / "0.wav")
+        backend = VirtualBackend(responses_dir=tmp_path, speed=10, response_delay=0.5)
+        player = StreamPlayer(sample_rate=RATE, block_size=80, backend=backend)
+        capture = CaptureStream(sample_rate=RATE, chunk=80, backend=backend)
+        capture.start()
+        player.play(np.full(RATE // 10, 0.5, dtype=np.float32)).result(timeout=5)
+        played_at = capture.position
+        time.sleep(0.2)
+        capture.close()
+        player.close()
+
+        audio = capture.read(0, capture.position)
+        onset = int(np.argmax(np.abs(audio) > 1000))
+        assert played_at < onset
+        # The response starts response_delay after the playback, in stream time.
+        assert abs(onset - played_at - RATE // 2) <= 3 * 80
+        # The response is heard over the -60 dBFS background noise.
+        response = audio[onset : onset + len(tone) - 1].astype(np.float64)
+        np.testing.assert_allclose(response, tone[1:], atol=200)
+
+    def test_no_response_before_playback(self, tmp_path):
+        make_response(tmp_path / "0.wav")
+        backend = VirtualBackend(responses_dir=tmp_path, speed=10)
+        capture = CaptureStream(sample_rate=RATE, chunk=80, backend=backend)
+        capture.start()
+        time.sleep(0.1)
+        capture.close()
+
+        audio = capture.read(0, capture.position)
+        assert len(audio) > 0
+        assert np.abs(audio).max() < 1000
+
+    def test_responses_cycle_in_name_order(self, tmp_path):
+        first = make_response(tmp_path / "a.wav", seconds=0.1)
+        second = make_response(tmp_path / "b.wav", seconds=0.2)
+        backend = VirtualBackend(responses_dir=tmp_path)
+        lengths = [len(backend.next_response(RATE)) for _ in range(3)]
+        assert lengths == [len(first), len(second), len(first)]
+
+    @pytest.mark.parametrize("speed", [1.0, 4.0])
+    def test_speed(self, speed):
+        backend = VirtualBackend(speed=speed)
+        capture = CaptureStream(sample_rate=RATE, chunk=80, backend=backend)
+        capture.start()
+        start = time.perf_counter()
+        assert capture.wait(RATE // 4, timeout=2)
+        elapsed = time.perf_counter() - start
+        capture.close()
+        assert elapsed == pytest.approx(0.25 / speed, rel=0.5)
+
+    def test_recorder_ends_response_after_the_digits(self, tmp_path):
+        make_digits(tmp_path / "0.wav")
+        backend = VirtualBackend(responses_dir=tmp_path, speed=4, response_delay=0.1)
+        player = StreamPlayer(sample_rate=RATE, block_size=80, backend=backend)
+        recorder = Recorder(
+            store=False,
+            chunk=80,
+            timeout_length=3,
+            save_dir=str(tmp_path),
+            sample_rate=RATE,
+            vad=VAD(RATE),
+            endpointer=Endpointer(timeout=3, max_duration=10),
+            backend=backend,
+        )
+        messages = []
+        sink = logger.add(messages.append, format="{message}", level="DEBUG")
+        try:
+            recorder.capture.start()
+            time.sleep(0.1)
+            player.play(np.full(RATE // 10, 0.5, dtype=np.float32)).result(timeout=5)
+            recording = recorder.record()
+        finally:
+            logger.remove(sink)
+            recorder.close()
+            player.close()
+
+        assert any("3 segments" in message for message in messages)
+        # Three 0.4s digits with 0.3s gaps, the VAD hangover and min_hangover.
+        assert len(recording.audio) < 3.0 * RATE
@@ -0,0 +1,51 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from get_response.endpoint import Endpointer
+
+STEP = 0.01
+
+
+def run(endpointer, speech, seconds=20):
+    """Feed the endpointer a timeline and return when it ended the response."""
+    endpointer.start()
+    for time in np.arange(STEP, seconds, STEP):
+        is_speech = any(start <= time < end for start, end in speech)
+        if endpointer.update(time, is_speech):
+            return time
+    return None
+
+
+class Test_Endpointer:
+    def test_no_speech_times_out(self):
+        assert run(Endpointer(timeout=3), []) == pytest.approx(3, abs=STEP)
+
+    def test_complete_response_ends_early(self):
+        speech = [(0.5, 0.9), (1.2, 1.6), (1.9, 2.3)]
+        assert run(Endpointer(timeout=3, min_hangover=0.3), speech) == pytest.approx(
+            2.6, abs=2 * STEP
+        )
+
+    def test_incomplete_response_waits_for_the_timeout(self):
+        speech = [(0.5, 0.9), (1.2, 1.6)]
+        assert run(Endpointer(timeout=3), speech) == pytest.approx(4.6, abs=2 * STEP)
+
+    def test_hangover_is_learned_from_pauses(self):
+        endpointer = Endpointer(timeout=3, min_hangover=0.3, hangover_factor=2.0)
+        for _ in range(3):
+            run(endpointer, [(0.5, 0.9), (1.2, 1.6), (1.9, 2.3)])
+        assert endpointer.hangover == pytest.approx(0.6, abs=3 * STEP)
+        # Two digits only: the learned hangover ends the response.
+        assert run(endpointer, [(0.5, 0.9), (1.2, 1.6)]) == pytest.approx(
+            2.2, abs=3 * STEP
+        )
+
+    def test_short_noises_are_not_digits(self):
+        speech = [(0.5, 0.55), (1.0, 1.05), (1.5, 1.55)]
+        assert run(Endpointer(timeout=3), speech) > 4
+
+    def test_maximum_duration(self):
+        assert run(Endpointer(max_duration=5), [(0.5, 12)]) == pytest.approx(
+            5, abs=STEP
+        )
@@ -0,0 +1,50 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from audio_processing.mixer import Mixer
+from audio_processing.noise import Noise
+
+
+class ConstantNoise(Noise):
+    sample_rate = 1000
+
+    def generate_noise(self, signal, desired_snr_db):
+        return np.full(len(signal), 0.5)
+
+
+@pytest.fixture()
+def mixer():
+    return Mixer(
+        ConstantNoise(),
+        sample_rate=1000,
+        max_duration=1.0,
+        pre_padding=0.1,
+        post_padding=0.2,
+        fade=0.01,
+    )
+
+
+class Test_Mixer:
+    def test_layout(self, mixer):
+        mix = mixer.mix(np.ones(500, np.float32), 1000, snr_db=0)
+        assert mix.dtype == np.float32
+        assert len(mix) == 100 + 500 + 200
+        assert mix[0] == 0
+        assert mix[50] == pytest.approx(0.5)
+        assert mix[300] == pytest.approx(1.5)
+        assert mix[-1] == pytest.approx(0, abs=1e-6)
+
+    def test_buffers_are_reused_in_turn(self, mixer):
+        first = mixer.mix(np.ones(10, np.float32), 1000, 0)
+        second = mixer.mix(np.ones(10, np.float32), 1000, 0)
+        third = mixer.mix(np.ones(10, np.float32), 1000, 0)
+        assert not np.shares_memory(first, second)
+        assert np.shares_memory(first, third)
+
+    def test_longer_stimuli_grow_buffer(self, mixer):
+        assert len(mixer.mix(np.ones(2000, np.float32), 1000, 0)) == 2300
+
+    def test_sample_rate_mismatch(self, mixer):
+        with pytest.raises(ValueError):
+            mixer.mix(np.ones(10), 22050, 0)
@@ -0,0 +1,248 @@
+# flake8: noqa
+import numpy as np
+import pytest
+from scipy.io import wavfile
+from scipy.signal import butter, lfilter, welch
+
+from audio_processing.noise import (
+    Babble,
+    MultiTalkerBabble,
+    SpeechShapedNoise,
+    StreamedBabble,
+    WhiteNoise,
+)
+from audio_processing.noise_pool import NoisePool
+from audio_processing.noise_reader import WavReader
+from audio_processing.util import calculate_db_spl
+
+
+@pytest.fixture()
+def noise_file(tmp_path):
+    path = tmp_path / "babble.wav"
+    rng = np.random.default_rng(0)
+    wavfile.write(path, 22050, (rng.normal(size=22050 * 20) * 3000).astype(np.int16))
+    return path
+
+
+class Test_Babble:
+    def test_level_and_length(self, noise_file):
+        signal = np.zeros(22050, np.float32)
+        noise = Babble(str(noise_file)).generate_noise(signal, desired_snr_db=5)
+        assert noise.dtype == np.float32
+        assert len(noise) == len(signal)
+        assert calculate_db_spl(noise) == pytest.approx(60, abs=0.2)
+
+    def test_resampled_window(self, noise_file):
+        babble = Babble(str(noise_file), sample_rate=44100)
+        noise = babble.generate_noise(np.zeros(44100), desired_snr_db=0)
+        assert babble.sample_rate == 44100
+        assert len(noise) == 44100
+        assert calculate_db_spl(noise) == pytest.approx(65, abs=0.5)
+
+    def test_seeded_babble_is_reproducible(self, noise_file):
+        signal = np.zeros(1000)
+        first = Babble(str(noise_file), seed=3).generate_noise(signal, 0)
+        second = Babble(str(noise_file), seed=3).generate_noise(signal, 0)
+        np.testing.assert_array_equal(first, second)
+
+
+class Test_NoisePool:
+    def test_replay_is_bit_exact(self):
+        pool = NoisePool(seed=1234, size=1000)
+        windows = [pool.take(300) for _ in range(5)]
+        for window, generation, offset in windows:
+            replayed = NoisePool.replay(1234, generation, offset, 300, size=1000)
+            np.testing.assert_array_equal(window, replayed)
+        assert windows[-1][1] == 1
+
+    def test_ring_reuses_buffer(self):
+        pool = NoisePool(seed=1, size=1000, refill=False)
+        first, _, _ = pool.take(600)
+        second, generation, offset = pool.take(600)
+        assert generation == 0 and offset == 0
+        np.testing.assert_array_equal(first, second)
+
+    def test_window_longer_than_pool(self):
+        with pytest.raises(ValueError):
+            NoisePool(seed=1, size=100).take(101)
+
+
+class Test_WhiteNoise:
+    def test_seeded_noise_is_reproducible(self):
+        signal = np.ones(500, np.float32)
+        first = WhiteNoise(seed=7, pool_size=10000).generate_noise(signal, 0)
+        second = WhiteNoise(seed=7, pool_size=10000).generate_noise(signal, 0)
+        assert first.dtype == np.float32
+        np.testing.assert_array_equal(first, second)
+
+
+@pytest.fixture()
+def talkers_dir(tmp_path):
+    rng = np.random.default_rng(1)
+    for i, scale in enumerate([100, 1000, 10000]):
+        samples = rng.normal(size=11025 * (i + 1)) * scale
+        wavfile.write(tmp_path / f"talker{i}.wav", 11025, samples.astype(np.int16))
+    return tmp_path
+
+
+class Test_MultiTalkerBabble:
+    def test_level_and_length(self, talkers_dir):
+        babble = MultiTalkerBabble(str(talkers_dir), n_talkers=3, sample_rate=22050)
+        noise = babble.generate_noise(np.zeros(50000), desired_snr_db=5)
+        assert noise.dtype == np.float32
+        assert len(noise) == 50000
+        assert calculate_db_spl(noise) == pytest.approx(60, abs=0.01)
+
+    def test_talkers_are_level_normalized(self, talkers_dir):
+        babble = MultiTalkerBabble(str(talkers_dir), n_talkers=1, sample_rate=11025)
+        for start, length in zip(babble._starts, babble._lengths):
+            talker = babble._samples[start : start + length]
+            assert np.sqrt(np.mean(talker**2)) == pytest.approx(1, rel=1e-3)
+
+    def test_more_talkers_than_recordings(self, talkers_dir):
+        babble = MultiTalkerBabble(str(talkers_dir), n_talkers=5, seed=2)
+        assert len(babble.generate_noise(np.zeros(1000), 0)) == 1000
+
+    def test_seeded_babble_is_reproducible(self, talkers_dir):
+        first = MultiTalkerBabble(str(talkers_dir), seed=4)._synthesize(3000)
+        second = MultiTalkerBabble(str(talkers_dir), seed=4)._synthesize(3000)
+        np.testing.assert_array_equal(first, second)
+
+    def test_empty_directory(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            MultiTalkerBabble(str(tmp_path))
+
+
+class LowPassVocalizer:
+    sample_rate = 16000
+    sources: list = []
+    settings: dict = {}
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_sound(self, text):
+        self.calls += 1
+        b, a = butter(4, 1000, fs=self.sample_rate)
+        noise = np.random.default_rng(len(text)).normal(size=self.sample_rate)
+        return lfilter(b, a, noise).astype(np.float32)
+
+
+class Test_SpeechShapedNoise:
+    def test_follows_the_spectrum(self, tmp_path):
+        noise = SpeechShapedNoise(
+            LowPassVocalizer(), ["one", "two"], 16000, cache_dir=tmp_path, seed=0
+        )
+        sound = noise.generate_noise(np.zeros(16000 * 4), desired_snr_db=5)
+        freqs, psd = welch(sound, fs=16000, nperseg=1024)
+        assert sound.dtype == np.float32
+        assert psd[freqs < 500].mean() > 100 * psd[freqs > 4000].mean()
+        assert calculate_db_spl(sound) == pytest.approx(60, abs=0.5)
+
+    def test_filter_is_cached(self, tmp_path):
+        vocalizer = LowPassVocalizer()
+        first = SpeechShapedNoise(vocalizer, ["one"], 16000, cache_dir=tmp_path)
+        second = SpeechShapedNoise(vocalizer, ["one"], 16000, cache_dir=tmp_path)
+        assert vocalizer.calls == 1
+        np.testing.assert_array_equal(first._taps, second._taps)
+        assert len(list(tmp_path.glob("ltas-*.npz"))) == 1
+
+    def test_window_longer_than_buffer(self, tmp_path):
+        noise = SpeechShapedNoise(
+            LowPassVocalizer(), ["one"], 16000, cache_dir=tmp_path, duration=0.5
+        )
+        assert len(noise.generate_noise(np.zeros(16000), 0)) == 16000
+
+
+class Test_WavReader:
+    def test_reads_window(self, noise_file):
+        _, samples = wavfile.read(noise_file)
+        reader = WavReader(str(noise_file))
+        np.testing.assert_array_equal(reader.read(1000, 500), samples[1000:1500])
+        assert len(reader.read(reader.n_frames - 10, 500)) == 10
+
+    def test_stereo_is_mixed_down(self, tmp_path):
+        samples = np.array([[100, 300], [-200, 0]], dtype=np.int16)
+        wavfile.write(tmp_path / "stereo.wav", 8000, samples)
+        np.testing.assert_array_equal(
+            WavReader(str(tmp_path / "stereo.wav")).read(0, 2), [200, -100]
+        )
+
+
+class Test_StreamedBabble:
+    def test_level_and_length(self, noise_file, tmp_path):
+        babble = StreamedBabble(str(noise_file), read_ahead=2.0, cache_dir=tmp_path)
+        noise = babble.generate_noise(np.zeros(22050), desired_snr_db=5)
+        babble.close()
+        assert noise.dtype == np.float32
+        assert len(noise) == 22050
+        assert calculate_db_spl(noise) == pytest.approx(60, abs=0.2)
+
+    def test_window_longer_than_read_ahead(self, noise_file, tmp_path):
+        babble = StreamedBabble(
+            str(noise_file), sample_rate=44100, read_ahead=0.5, cache_dir=tmp_path
+        )
+        assert len(babble.generate_noise(np.zeros(44100), 0)) == 44100
+        babble.close()
+
+    def test_reads_ahead_at_the_window_length(self, noise_file, tmp_path):
+        babble = StreamedBabble(str(noise_file), read_ahead=0.1, cache_dir=tmp_path)
+        babble.generate_noise(np.zeros(4410), 0)
+        assert len(babble._pending[1].result()) == 4410
+        babble.generate_noise(np.zeros(2205), 0)
+        assert len(babble._pending[1].result()) == 4410
+        babble.close()
+
+    def test_seeded_windows_match_the_file(self, noise_file, tmp_path):
+        _, samples = wavfile.read(noise_file)
+        options = {"seed": 5, "read_ahead": 1.0, "cache_dir": tmp_path}
+        first = StreamedBabble(str(noise_file), **options)
+        second = StreamedBabble(str(noise_file), **options)
+        for _ in range(3):
+            window = first._read_window(2000)
+            np.testing.assert_array_equal(window, second._read_window(2000))
+            starts = np.flatnonzero(samples == window[0])
+            assert any(np.array_equal(window, samples[i : i + 2000]) for i in starts)
+        first.close()
+        second.close()
+
+    def test_level_is_cached(self, noise_file, tmp_path, monkeypatch):
+        first = StreamedBabble(str(noise_file), cache_dir=tmp_path)
+        first.close()
+        assert len(list(tmp_path.glob("rms-*.npz"))) == 1
+
+        def decode_all(reader):
+            raise AssertionError("the whole file was decoded")
+
+        monkeypatch.setattr("audio_processing.noise.streamed_rms_amplitude", decode_all)
+        second = StreamedBabble(str(noise_file), cache_dir=tmp_path)
+        second.close()
+        assert second._noise_rms == first._noise_rms
+
+    def test_level_follows_the_file(self, noise_file, tmp_path):
+        first = StreamedBabble(str(noise_file), cache_dir=tmp_path)
+        first.close()
+        wavfile.write(noise_file, 22050, np.full(22050, 1000, dtype=np.int16))
+        second = StreamedBabble(str(noise_file), cache_dir=tmp_path)
+        second.close()
+        assert second._noise_rms == pytest.approx(1000)
+        assert len(list(tmp_path.glob("rms-*.npz"))) == 2
+
+
+class Test_MixSnrs:
+    @pytest.mark.parametrize("make_noise", ["white", "babble"])
+    def test_matches_per_snr_noise(self, make_noise, noise_file):
+        snrs = np.array([-10, 0, 5, 20])
+        signal = np.random.default_rng(0).normal(size=4000).astype(np.float32) * 1000
+
+        def noise():
+            if make_noise == "white":
+                return WhiteNoise(seed=1, pool_size=10000)
+            return Babble(str(noise_file), seed=1)
+
+        mixes = noise().mix_snrs(signal, snrs)
+        assert mixes.shape == (4, 4000)
+        assert mixes.dtype == np.float32
+        for mix, snr in zip(mixes, snrs):
+            expected = signal + noise().generate_noise(signal, snr)
+            np.testing.assert_allclose(mix, expected, rtol=1e-4, atol=1e-2)
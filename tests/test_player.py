@@ -0,0 +1,70 @@
+# flake8: noqa
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from vocalizer.player import StreamPlayer
+
+
+class FakeStream:
+    """Stand-in for sounddevice.OutputStream that drains the player in a thread."""
+
+    latency = 0.01
+
+    def __init__(self, player, block_size):
+        self.player = player
+        self.block_size = block_size
+        self.played = []
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        status = SimpleNamespace(output_underflow=False)
+        while self._running:
+            outdata = np.zeros((self.block_size, 1), dtype=np.float32)
+            self.player._callback(outdata, self.block_size, None, status)
+            self.played.append(outdata[:, 0].copy())
+            time.sleep(0.001)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+    def close(self):
+        pass
+
+
+def make_player(buffer_seconds=1.0):
+    player = StreamPlayer(sample_rate=100, block_size=10, buffer_seconds=buffer_seconds)
+    player._stream = FakeStream(player, 10)
+    return player
+
+
+class Test_StreamPlayer:
+    def test_plays_waveform_in_order(self):
+        player = make_player()
+        stream = player._stream
+        wave = np.arange(1, 251, dtype=np.float32)
+        player.play(wave).result(timeout=5)
+        player.close()
+        played = np.concatenate(stream.played)
+        played = played[played != 0]
+        np.testing.assert_array_equal(played, wave)
+
+    def test_play_returns_before_the_end(self):
+        player = make_player()
+        future = player.play(np.ones(100, dtype=np.float32))
+        assert not future.done()
+        future.result(timeout=5)
+        player.close()
+
+    def test_chunked_writes(self):
+        player = make_player()
+        player.write(np.ones(30))
+        player.write(np.ones(30))
+        player.finish().result(timeout=5)
+        assert player._read == 60
+        player.close()
@@ -0,0 +1,56 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from stimuli_generator.prefetch import StimuliPrefetcher
+from stimuli_generator.questions import DigitQuestions
+from vocalizer.vocalizer import Vocalizer
+
+
+class FakeVocalizer(Vocalizer):
+    sample_rate = 22050
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def get_sound(self, text: str) -> np.ndarray:
+        if self.fail:
+            raise RuntimeError("synthesis failed")
+        return np.full(10, len(text), dtype=np.float32)
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_prepared_stimuli_match_question(depth):
+    prefetcher = StimuliPrefetcher(DigitQuestions(), FakeVocalizer(), depth=depth)
+    prefetcher.start()
+    try:
+        for _ in range(5):
+            stimuli = prefetcher.get()
+            assert stimuli.question == "The number is " + " ".join(stimuli.main_words)
+            assert stimuli.sound[0] == len(stimuli.question)
+            assert stimuli.sample_rate == 22050
+    finally:
+        prefetcher.stop()
+
+
+def test_resampled_to_output_rate():
+    prefetcher = StimuliPrefetcher(
+        DigitQuestions(), FakeVocalizer(), depth=0, sample_rate=44100
+    )
+    stimuli = prefetcher.get()
+    assert stimuli.sample_rate == 44100
+    assert len(stimuli.sound) == 20
+
+
+def test_set_stimuli_is_checked():
+    questions = DigitQuestions()
+    questions.set_stimuli("The number is one two three", ["one", "two", "three"])
+    assert questions.check_answer(["one", "two", "three"])
+
+
+def test_error_is_raised_in_consumer():
+    prefetcher = StimuliPrefetcher(DigitQuestions(), FakeVocalizer(fail=True))
+    prefetcher.start()
+    with pytest.raises(RuntimeError):
+        prefetcher.get()
+    prefetcher.stop()
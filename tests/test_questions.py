@@ -0,0 +1,10 @@
+# flake8: noqa
+from stimuli_generator.questions import DigitQuestions
+
+
+def test_all_stimuli():
+    stimuli = DigitQuestions().all_stimuli()
+    assert len(stimuli) == 720
+    assert len(set(stimuli)) == 720
+    assert "The number is one two three" in stimuli
+    assert "The number is one one two" not in stimuli
@@ -0,0 +1,38 @@
+# flake8: noqa
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from audio_processing.util import calculate_db_spl
+from vocalizer.vocalizer import Recorded
+
+DIGITS_22K = Path("media/digit_recordings/22k")
+
+
+class Test_Recorded:
+    def test_level_and_type(self):
+        sound = Recorded(DIGITS_22K).get_sound("The number is one two three")
+        assert sound.dtype == np.float32
+        assert calculate_db_spl(sound) == pytest.approx(65, abs=0.01)
+
+    def test_digit_gap(self):
+        plain = Recorded(DIGITS_22K).get_sound("The number is one two three")
+        gapped = Recorded(DIGITS_22K, digit_gap=0.1).get_sound(
+            "The number is one two three"
+        )
+        assert len(gapped) == len(plain) + 2 * 2205
+        assert calculate_db_spl(gapped) == pytest.approx(65, abs=0.01)
+
+    def test_mixed_sample_rates(self, tmp_path):
+        for path in DIGITS_22K.glob("*.wav"):
+            (tmp_path / path.name).write_bytes(path.read_bytes())
+        (tmp_path / "one.wav").write_bytes(
+            Path("media/digit_recordings/44k/one.wav").read_bytes()
+        )
+        with pytest.raises(ValueError):
+            Recorded(tmp_path)
+
+    def test_prepend_sample_rate(self):
+        with pytest.raises(ValueError):
+            Recorded(DIGITS_22K, prepend_src=Path("media/DIN/The_Digits_Are.wav"))
@@ -0,0 +1,87 @@
+# flake8: noqa
+import threading
+
+import numpy as np
+
+from get_response.asr import ASR
+from get_response.streaming import StreamingRecognizer
+from tests.test_capture import RATE, FakeInput, make_recorder
+
+
+class SlowASR(ASR):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def _transcribe(self, src):
+        raise NotImplementedError
+
+    def _transcribe_audio(self, audio, sample_rate):
+        self.release.wait(timeout=5)
+        return ["", "zero", "one", "two"][len(audio)]
+
+
+class ToneASR(ASR):
+    """Name each tone of the audio after its frequency, in 10ms frames."""
+
+    words = {300: "one", 500: "two", 700: "three"}
+
+    def _transcribe(self, src):
+        raise NotImplementedError
+
+    def _transcribe_audio(self, audio, sample_rate):
+        frame = sample_rate // 100
+        frames = audio[: len(audio) // frame * frame].reshape(-1, frame)
+        loud = np.abs(frames).max(axis=1) > 1000
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], loud, [0]])))
+        words = []
+        for start, end in zip(edges[::2], edges[1::2]):
+            tone = frames[start:end].ravel().astype(np.float64)
+            peak = np.argmax(np.abs(np.fft.rfft(tone))) * sample_rate / len(tone)
+            words.append(self.words[int(round(peak / 100) * 100)])
+        return " ".join(words)
+
+
+def make_response(frequencies=(300, 500, 700), gap=0.6):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(0.4 * RATE)) / RATE
+    parts = [rng.normal(scale=30, size=RATE)]
+    for frequency in frequencies:
+        parts.append(8000 * np.sin(2 * np.pi * frequency * t))
+        parts.append(rng.normal(scale=30, size=int(gap * RATE)))
+    parts.append(rng.normal(scale=30, size=2 * RATE))
+    return np.concatenate(parts).astype(np.int16)
+
+
+class Test_StreamingRecognizer:
+    def test_segments_are_joined_in_order(self):
+        asr = SlowASR()
+        recognizer = StreamingRecognizer(asr, 16000)
+        for length in (3, 1, 0, 2):
+            recognizer.add(np.zeros(length, dtype=np.int16))
+        asr.release.set()
+        assert recognizer.result() == "two zero one"
+        recognizer.close()
+
+    def test_reset_forgets_previous_response(self):
+        asr = SlowASR()
+        asr.release.set()
+        recognizer = StreamingRecognizer(asr, 16000)
+        recognizer.add(np.zeros(1, dtype=np.int16))
+        recognizer.reset()
+        recognizer.add(np.zeros(2, dtype=np.int16))
+        assert recognizer.result() == "one"
+        recognizer.close()
+
+    def test_segments_transcribe_like_the_whole_recording(self, tmp_path):
+        asr = ToneASR()
+        recognizer = StreamingRecognizer(asr, RATE)
+        recorder = make_recorder(tmp_path)
+        recorder.capture._stream = FakeInput(recorder.capture, make_response())
+        recording = recorder.record(on_segment=recognizer.add)
+        recorder.close()
+
+        whole = asr.get(audio=recording.audio, sample_rate=RATE)
+        assert whole == "one two three"
+        assert recognizer.result() == whole
+        recognizer.close()
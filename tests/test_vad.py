@@ -0,0 +1,79 @@
+# flake8: noqa
+import math
+import struct
+
+import numpy as np
+import pytest
+
+from get_response.vad import VAD, pcm16_rms
+
+RATE = 16000
+
+
+def to_pcm(signal):
+    return (np.asarray(signal) * 32767).astype(np.int16).tobytes()
+
+
+def noise(seconds, scale=0.003, seed=0):
+    return np.random.default_rng(seed).normal(scale=scale, size=int(seconds * RATE))
+
+
+def tone(seconds, amplitude=0.3):
+    return amplitude * np.sin(2 * np.pi * 300 * np.arange(int(seconds * RATE)) / RATE)
+
+
+class Test_PCM16RMS:
+    def test_matches_struct_implementation(self):
+        frame = to_pcm(noise(0.1, scale=0.2))
+        shorts = struct.unpack("%dh" % (len(frame) // 2), frame)
+        expected = math.sqrt(sum((s / 32768) ** 2 for s in shorts) / len(shorts))
+        assert pcm16_rms(frame) == pytest.approx(expected * 1000, rel=1e-5)
+
+    def test_empty_frame(self):
+        assert pcm16_rms(b"") == 0.0
+
+
+class Test_VAD:
+    def test_silence_is_not_speech(self):
+        vad = VAD(RATE)
+        assert not vad.process(to_pcm(noise(2)))
+        assert vad.noise_floor_db == pytest.approx(-50.5, abs=3)
+
+    def test_speech_onset_and_hangover(self):
+        vad = VAD(RATE, hangover_ms=150)
+        vad.process(to_pcm(noise(1)))
+        assert vad.process(to_pcm(tone(0.3) + noise(0.3, seed=1)))
+        # a gap shorter than the hangover does not end the speech
+        assert vad.process(to_pcm(noise(0.1, seed=2)))
+        assert not vad.process(to_pcm(noise(0.1, seed=3)))
+
+    def test_floor_follows_louder_background(self):
+        vad = VAD(RATE, floor_rise_db=20)
+        vad.process(to_pcm(noise(1)))
+        vad.process(to_pcm(noise(3, scale=0.03, seed=1)))
+        assert not vad.is_speech
+        assert vad.noise_floor_db == pytest.approx(-30.5, abs=3)
+
+    def test_digital_silence_leaves_the_floor(self):
+        vad = VAD(RATE)
+        vad.process(to_pcm(noise(1)))
+        floor = vad.noise_floor_db
+        vad.process(to_pcm(np.zeros(RATE)))
+        assert vad.noise_floor_db == pytest.approx(floor)
+        assert not vad.process(to_pcm(noise(1, seed=1)))
+
+    def test_starts_on_digital_silence(self):
+        vad = VAD(RATE)
+        vad.process(to_pcm(np.zeros(RATE // 2)))
+        assert vad.noise_floor_db is None
+        assert not vad.process(to_pcm(noise(1)))
+        assert vad.process(to_pcm(tone(0.3)))
+
+    def test_chunks_split_inside_frames(self):
+        signal = to_pcm(noise(0.5, scale=0.1))
+        whole = VAD(RATE).frame_levels(signal)
+        vad = VAD(RATE)
+        pieces = [
+            vad.frame_levels(signal[i : i + 202]) for i in range(0, len(signal), 202)
+        ]
+        np.testing.assert_allclose(np.concatenate(pieces), whole, rtol=1e-5)
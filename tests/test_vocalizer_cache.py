@@ -0,0 +1,76 @@
+# flake8: noqa
+import numpy as np
+import pytest
+
+from vocalizer.cache import CachedVocalizer, fingerprint
+from vocalizer.vocalizer import Vocalizer
+
+
+class FakeVocalizer(Vocalizer):
+    sample_rate = 22050
+
+    def __init__(self, src):
+        self.src = src
+        self.calls = 0
+
+    @property
+    def sources(self):
+        return [self.src]
+
+    def get_sound(self, text: str) -> np.ndarray:
+        self.calls += 1
+        return np.full(100, len(text), dtype=np.float32)
+
+
+@pytest.fixture()
+def source(tmp_path):
+    src = tmp_path / "model"
+    src.mkdir()
+    (src / "model.ckpt").write_bytes(b"weights")
+    return src
+
+
+class Test_CachedVocalizer:
+    def test_memory_hit(self, tmp_path, source):
+        vocalizer = FakeVocalizer(source)
+        cache = CachedVocalizer(vocalizer, tmp_path / "cache")
+        first = cache.get_sound("The number is one two three")
+        second = cache.get_sound("The number is one two three")
+        assert vocalizer.calls == 1
+        assert second is first
+        assert cache.stats == {"hits": 1, "disk_hits": 0, "misses": 1}
+
+    def test_disk_hit(self, tmp_path, source):
+        CachedVocalizer(FakeVocalizer(source), tmp_path / "cache").get_sound("a")
+        vocalizer = FakeVocalizer(source)
+        cache = CachedVocalizer(vocalizer, tmp_path / "cache")
+        np.testing.assert_array_equal(cache.get_sound("a"), np.full(100, 1))
+        assert vocalizer.calls == 0
+        assert cache.stats["disk_hits"] == 1
+
+    def test_memory_bound(self, tmp_path, source):
+        cache = CachedVocalizer(FakeVocalizer(source), tmp_path / "cache", 800)
+        for text in ["a", "b", "c"]:
+            cache.get_sound(text)
+        assert list(cache._memory) == ["b", "c"]
+
+    def test_invalidated_on_source_change(self, tmp_path, source):
+        CachedVocalizer(FakeVocalizer(source), tmp_path / "cache").get_sound("a")
+        (source / "model.ckpt").write_bytes(b"new weights")
+        vocalizer = FakeVocalizer(source)
+        cache = CachedVocalizer(vocalizer, tmp_path / "cache")
+        cache.get_sound("a")
+        assert vocalizer.calls == 1
+        assert len(list(cache.cache_dir.parent.iterdir())) == 1
+
+
+def test_fingerprint_changes(source):
+    before = fingerprint([source])
+    (source / "model.ckpt").write_bytes(b"other weights")
+    assert fingerprint([source]) != before
+
+
+def test_fingerprint_settings(source):
+    assert fingerprint([source], {"mode": "full"}) != fingerprint(
+        [source], {"mode": "segmental"}
+    )
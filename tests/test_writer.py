@@ -0,0 +1,43 @@
+# flake8: noqa
+import os
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from get_response.writer import RecordingWriter
+
+
+def recording(value, length=100):
+    return np.full(length, value, dtype=np.int16).tobytes()
+
+
+class Test_RecordingWriter:
+    def test_numbers_follow_existing_files(self, tmp_path):
+        (tmp_path / "3.wav").touch()
+        (tmp_path / "notes.txt").touch()
+        writer = RecordingWriter(str(tmp_path), 8000)
+        paths = [writer.submit(recording(i)).result(timeout=5) for i in range(2)]
+        writer.close()
+        assert paths == [str(tmp_path / "4.wav"), str(tmp_path / "5.wav")]
+
+    def test_does_not_list_the_directory_per_write(self, tmp_path, monkeypatch):
+        writer = RecordingWriter(str(tmp_path), 8000)
+        monkeypatch.setattr(os, "listdir", None)
+        futures = [writer.submit(recording(i)) for i in range(20)]
+        writer.close()
+        for i, future in enumerate(futures):
+            rate, samples = wavfile.read(future.result())
+            assert rate == 8000
+            np.testing.assert_array_equal(samples, np.full(100, i))
+
+    def test_flush_syncs_pending_files(self, tmp_path):
+        writer = RecordingWriter(str(tmp_path), 8000, fsync_every=10)
+        writer.submit(recording(1))
+        writer.flush()
+        assert writer._unsynced == []
+        writer.close()
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(NotImplementedError):
+            RecordingWriter(str(tmp_path), 8000, file_format="mp3")
@@ -1,14 +1,18 @@
 """Utility module for the main script."""
 
+import time
+from concurrent.futures import Future
+
 import numpy as np
 import yaml
+from colorama import Fore
 from loguru import logger
 from yaml import YAMLError
 
-from audio_processing.noise import Noise
+from audio_processing.mixer import Mixer
 from hearing_test.test_manager import ASRTestManager, CliTestManager, TestManager
-from vocalizer.utils import play_sound
-from vocalizer.vocalizer import Vocalizer
+from stimuli_generator.prefetch import StimuliPrefetcher
+from vocalizer.utils import play_sound_async
 
 
 def read_conf(src: str = "config.yaml") -> dict:
@@ -31,20 +35,40 @@ def read_conf(src: str = "config.yaml") -> dict:
             raise exc
 
 
-def play_stimuli(sound_generator: Vocalizer, snr_db: int, stimuli: str, noise: Noise):
-    """Play the stimuli to the patient.
+def play_speech(
+    sound_wave: np.ndarray, sample_rate: int, snr_db: int, mixer: Mixer
+) -> Future:
+    """Mix an already vocalized stimuli with noise and start playing it.
 
     Args:
-        sound_generator (Vocalizer): object to generate sound using a TTS.
+        sound_wave (np.ndarray): clean speech of the stimuli.
+        sample_rate (int): sample rate of the speech.
         snr_db (int): signal to noise ratio in db.
-        stimuli (str): The stimuli to play.
-        noise (Noise): object to generate noise.
+        mixer (Mixer): object mixing the stimuli with noise at the output rate.
+
+    Returns:
+        Future: Completed when the stimuli has been played.
+    """
+    noisy_wave = mixer.mix(sound_wave, sample_rate, snr_db)
+    return play_sound_async(wave=noisy_wave, fs=mixer.sample_rate)
+
+
+def get_prefetcher(manager: TestManager, configs: dict) -> StimuliPrefetcher:
+    """Create the object preparing the stimuli of the upcoming trials.
+
+    Args:
+        manager (TestManager): the test manager.
+        configs (dict): loaded config file.
+
+    Returns:
+        StimuliPrefetcher: prefetcher with its own stimuli generator.
     """
-    sound_wave = sound_generator.get_sound(stimuli)
-    sound_wave = np.pad(sound_wave, (5000, 5000), "constant", constant_values=(0, 0))
-    noise_signal = noise.generate_noise(sound_wave, snr_db)
-    noisy_wave = sound_wave + noise_signal
-    play_sound(wave=noisy_wave, fs=22050)
+    return StimuliPrefetcher(
+        questions=type(manager.stimuli_generator)(),
+        vocalizer=manager.sound_generator,
+        depth=configs["test"].get("prefetch", 0),
+        sample_rate=manager.sample_rate,
+    )
 
 
 def get_test_manager(configs: dict) -> TestManager:
@@ -65,3 +89,75 @@ def get_test_manager(configs: dict) -> TestManager:
         return ASRTestManager(configs)
     else:
         raise NotImplementedError
+
+
+def run_test(
+    manager: TestManager,
+    prefetcher: StimuliPrefetcher,
+    start: float,
+    interactive: bool = True,
+) -> list[float]:
+    """Run the trials until the stop condition of the hearing test is met.
+
+    Args:
+        manager (TestManager): the test manager.
+        prefetcher (StimuliPrefetcher): source of the vocalized stimuli.
+        start (float): time.perf_counter() when the test started to load.
+        interactive (bool): Whether to wait for enter before each trial.
+            Defaults to True.
+
+    Returns:
+        list[float]: Duration of each trial in seconds, from the stimuli to the
+            checked response.
+    """
+    snr_db = manager.start_snr
+    correct_count = incorrect_count = 0
+    iteration = 1
+    waiting_time = 0.0
+    durations = []
+    while not manager.hearing_test.stop_condition():
+        if interactive:
+            print(Fore.RED + "Press Enter to play the next digits")
+            wait_start = time.perf_counter()
+            input()
+            waiting_time += time.perf_counter() - wait_start
+        trial_start = time.perf_counter()
+        stimuli = prefetcher.get()
+        if iteration == 1:
+            # The time spent waiting for the participant is not part of the startup.
+            startup_time = time.perf_counter() - start - waiting_time
+            logger.info(f"Time to first stimulus: {startup_time:.2f}s")
+        question = stimuli.question
+        manager.stimuli_generator.set_stimuli(question, stimuli.main_words)
+        print(Fore.YELLOW + "Listen to the numbers")
+        logger.debug(f"{iteration} :The stimuli is: {question}")
+        playback = play_speech(
+            stimuli.sound, stimuli.sample_rate, snr_db, manager.mixer
+        )
+        if manager.wait_for_playback:
+            playback.result()
+
+        transcribe = manager.get_response()
+
+        matched = manager.stimuli_generator.check_answer(transcribe)
+        logger.debug(f"Matched: {matched}")
+
+        if matched:
+            correct_count += 1
+        else:
+            incorrect_count += 1
+
+        new_snr_db = manager.hearing_test.get_next_snr(
+            correct_count, incorrect_count, snr_db
+        )
+        manager.hearing_test.update_variables(matched, snr_db)
+        logger.debug(f"New SNR: {new_snr_db}")
+        if new_snr_db != snr_db:
+            snr_db = new_snr_db
+            correct_count = incorrect_count = 0
+        durations.append(time.perf_counter() - trial_start)
+        iteration += 1
+
+    logger.debug(f"Final SRT: {manager.hearing_test.srt} \n")
+    print(Fore.RED + "End of the test")
+    return durations
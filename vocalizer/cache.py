@@ -0,0 +1,206 @@
+"""Two-tier (memory + disk) cache for generated stimuli waveforms."""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from vocalizer.vocalizer import Vocalizer
+
+
+def fingerprint(paths: list[Path], settings: Optional[dict] = None) -> str:
+    """Compute a fingerprint of the files a vocalizer's output depends on.
+
+    The fingerprint is built from the resolved path, size and modification time of
+    every file under the given paths, so it changes whenever a checkpoint is
+    replaced or re-downloaded, without reading the (large) checkpoints themselves.
+
+    Args:
+        paths (list[Path]): Files or directories to fingerprint.
+        settings (Optional[dict]): Options of the vocalizer. Defaults to None.
+
+    Returns:
+        str: Hex digest identifying the current state of the files.
+    """
+    digest = hashlib.sha256(json.dumps(settings or {}, sort_keys=True).encode())
+    for path in sorted(Path(p) for p in paths):
+        files = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file in files:
+            resolved = file.resolve()
+            if not resolved.is_file():
+                continue
+            stat = resolved.stat()
+            digest.update(f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+class CachedVocalizer(Vocalizer):
+    """Cache the output of a vocalizer in memory and on disk.
+
+    Waveforms are kept in an in-memory LRU bounded by size in bytes and persisted
+    as .npy files in a directory keyed by the fingerprint of the wrapped
+    vocalizer's sources. When the sources change, the stale directory is removed.
+    """
+
+    def __init__(
+        self,
+        vocalizer: Vocalizer,
+        cache_dir: Path,
+        max_memory_bytes: int = 256 * 2**20,
+    ) -> None:
+        """Initialize the cache and drop on-disk entries of outdated sources.
+
+        Args:
+            vocalizer (Vocalizer): The vocalizer to generate missing waveforms.
+            cache_dir (Path): Root directory of the on-disk store.
+            max_memory_bytes (int): Maximum size of the in-memory cache.
+                Defaults to 256 MiB.
+        """
+        self.vocalizer = vocalizer
+        self.sample_rate = vocalizer.sample_rate
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        root = Path(cache_dir) / type(vocalizer).__name__
+        self.fingerprint = fingerprint(vocalizer.sources, vocalizer.settings)
+        self.cache_dir = root / self.fingerprint
+        self._invalidate_stale(root)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def sources(self) -> list[Path]:
+        """Files the wrapped vocalizer's output depends on.
+
+        Returns:
+            list[Path]: Sources of the wrapped vocalizer.
+        """
+        return self.vocalizer.sources
+
+    @property
+    def settings(self) -> dict:
+        """Options of the wrapped vocalizer.
+
+        Returns:
+            dict: Settings of the wrapped vocalizer.
+        """
+        return self.vocalizer.settings
+
+    def warm_up(self) -> None:
+        """Prepare the models of the wrapped vocalizer."""
+        self.vocalizer.warm_up()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counts of the cache.
+
+        Returns:
+            dict[str, int]: memory hits, disk hits and misses.
+        """
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def get_sound(self, text: str) -> np.ndarray:
+        """Return the cached waveform of the text, generating it on a miss.
+
+        Args:
+            text (str): input string
+
+        Returns:
+            np.ndarray: read-only waveform with level of 65 dB SPL.
+        """
+        with self._lock:
+            sound = self._memory.get(text)
+            if sound is not None:
+                self._memory.move_to_end(text)
+                self.hits += 1
+                logger.debug(f"Stimuli cache hit: {self.stats}")
+                return sound
+
+        path = self._path(text)
+        if path.exists():
+            sound = np.load(path)
+            with self._lock:
+                self.disk_hits += 1
+            logger.debug(f"Stimuli cache disk hit: {self.stats}")
+        else:
+            sound = np.asarray(self.vocalizer.get_sound(text))
+            self._save(path, sound)
+            with self._lock:
+                self.misses += 1
+            logger.debug(f"Stimuli cache miss: {self.stats}")
+        sound.setflags(write=False)
+        self._remember(text, sound)
+        return sound
+
+    def clear(self) -> None:
+        """Remove every cached waveform from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, text: str) -> Path:
+        """Get the on-disk location of a stimuli.
+
+        Args:
+            text (str): input string
+
+        Returns:
+            Path: location of the .npy file.
+        """
+        key = hashlib.sha256(text.encode()).hexdigest()
+        return self.cache_dir / f"{key}.npy"
+
+    def _save(self, path: Path, sound: np.ndarray) -> None:
+        """Atomically write a waveform to the on-disk store.
+
+        Args:
+            path (Path): Destination of the waveform.
+            sound (np.ndarray): Waveform to store.
+        """
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, sound)
+        os.replace(tmp_path, path)
+
+    def _remember(self, text: str, sound: np.ndarray) -> None:
+        """Put a waveform in the in-memory LRU and evict the oldest entries.
+
+        Args:
+            text (str): input string
+            sound (np.ndarray): waveform of the text.
+        """
+        if sound.nbytes > self.max_memory_bytes:
+            return
+        with self._lock:
+            if text in self._memory:
+                return
+            self._memory[text] = sound
+            self._memory_bytes += sound.nbytes
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.nbytes
+
+    def _invalidate_stale(self, root: Path) -> None:
+        """Remove on-disk entries generated from a different version of the sources.
+
+        Args:
+            root (Path): Directory holding one sub-directory per fingerprint.
+        """
+        if not root.is_dir():
+            return
+        for stale in root.iterdir():
+            if stale.is_dir() and stale.name != self.fingerprint:
+                logger.debug(f"Removing outdated stimuli cache: {stale}")
+                shutil.rmtree(stale, ignore_errors=True)
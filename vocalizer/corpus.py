@@ -0,0 +1,102 @@
+"""Read and write a single-file corpus of pre-rendered stimuli."""
+
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"DINCORP1"
+ALIGNMENT = 64
+SUPPORTED_DTYPES = ("float32", "int16")
+
+
+def write_corpus(
+    path: Path,
+    sounds: dict[str, np.ndarray],
+    sample_rate: int,
+    dtype: str = "float32",
+) -> None:
+    """Write the stimuli waveforms into one indexed file.
+
+    The file starts with a magic string and a JSON header holding the sample rate,
+    the sample type, the scale of the samples and an index mapping each stimuli to
+    the offset and length (in samples) of its waveform. The samples of all stimuli
+    follow the header, aligned to 64 bytes, so the file can be memory-mapped.
+
+    Args:
+        path (Path): Destination of the corpus.
+        sounds (dict[str, np.ndarray]): Waveform of each stimuli.
+        sample_rate (int): Sample rate of the waveforms.
+        dtype (str): Type of the stored samples, float32 or int16.
+            Defaults to "float32".
+
+    Raises:
+        ValueError: If the sample type is not supported.
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported corpus dtype {dtype}, use {SUPPORTED_DTYPES}")
+
+    scale = 1.0
+    if dtype == "int16":
+        peak = max(float(np.max(np.abs(sound))) for sound in sounds.values())
+        scale = peak / np.iinfo(np.int16).max if peak > 0 else 1.0
+
+    index = {}
+    offset = 0
+    for text, sound in sounds.items():
+        index[text] = [offset, len(sound)]
+        offset += len(sound)
+
+    header = {
+        "sample_rate": sample_rate,
+        "dtype": dtype,
+        "scale": scale,
+        "index": index,
+    }
+    header_bytes = json.dumps(header).encode()
+    data_offset = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_offset - f.tell()))
+        for sound in sounds.values():
+            if dtype == "int16":
+                samples = np.round(np.asarray(sound) / scale).astype("<i2")
+            else:
+                samples = np.asarray(sound, dtype="<f4")
+            f.write(samples.tobytes())
+
+
+def read_header(path: Path) -> tuple[dict, int]:
+    """Read the header of a corpus file.
+
+    Args:
+        path (Path): Location of the corpus.
+
+    Raises:
+        ValueError: If the file is not a stimuli corpus.
+
+    Returns:
+        tuple[dict, int]: The header and the byte offset of the first sample.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a stimuli corpus")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    return header, _align(len(MAGIC) + 8 + header_len)
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the data alignment.
+
+    Args:
+        offset (int): Offset in bytes.
+
+    Returns:
+        int: The smallest aligned offset not before the input.
+    """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,183 @@
+"""Play audio through one persistent output stream fed from a ring buffer."""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+from audio_processing.devices import AudioBackend, AudioStream, get_backend
+
+
+class StreamPlayer:
+    """Keep one output stream open and play waveforms without blocking.
+
+    Samples are written into a ring buffer that the stream callback drains, so
+    playback starts as soon as the first chunk is written and no stream is opened
+    per trial. Each playback returns a future that completes once its last sample
+    has been handed to the audio device.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 44100,
+        block_size: int = 512,
+        buffer_seconds: float = 10.0,
+        latency: str = "low",
+        backend: Optional[AudioBackend] = None,
+    ) -> None:
+        """Initialize the player, the stream is opened on first use.
+
+        Args:
+            sample_rate (int): sample per second. Defaults to 44100.
+            block_size (int): frames requested by each callback. Defaults to 512.
+            buffer_seconds (float): Capacity of the ring buffer. Defaults to 10.0.
+            latency (str): Latency setting of the device. Defaults to "low".
+            backend (Optional[AudioBackend]): Devices to play on. Defaults to None,
+                the backend set with audio_processing.devices.set_backend.
+        """
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.latency_setting = latency
+        self.backend = backend
+        self._buffer = np.zeros(int(buffer_seconds * sample_rate), dtype=np.float32)
+        # Monotonic sample counters, the callback is the only one moving _read.
+        self._written = 0
+        self._read = 0
+        self._pending: deque[tuple[int, Future]] = deque()
+        self._playing = False
+        self._space = threading.Event()
+        self._write_lock = threading.Lock()
+        self._stream: Optional[AudioStream] = None
+        self.underruns = 0
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Output latency reported by the device.
+
+        Returns:
+            Optional[float]: latency in seconds, None before the stream is opened.
+        """
+        return None if self._stream is None else self._stream.latency
+
+    @property
+    def stats(self) -> dict:
+        """Underrun count and output latency of the player.
+
+        Returns:
+            dict: underruns and latency in seconds.
+        """
+        return {"underruns": self.underruns, "latency": self.latency}
+
+    def play(self, wave: np.ndarray) -> Future:
+        """Queue a whole waveform and return without waiting for it.
+
+        Args:
+            wave (np.ndarray): 1D input array representing a sound.
+
+        Returns:
+            Future: Completed when the waveform has been played.
+        """
+        self.write(wave)
+        return self.finish()
+
+    def write(self, chunk: np.ndarray) -> None:
+        """Append a chunk of the current playback, blocking only if the buffer is full.
+
+        Args:
+            chunk (np.ndarray): 1D array with the next samples.
+        """
+        self._open()
+        chunk = np.asarray(chunk, dtype=np.float32).ravel()
+        capacity = len(self._buffer)
+        with self._write_lock:
+            self._playing = True
+            start = 0
+            while start < len(chunk):
+                free = capacity - (self._written - self._read)
+                if free == 0:
+                    self._space.clear()
+                    self._space.wait(timeout=0.1)
+                    continue
+                count = min(free, len(chunk) - start)
+                self._copy_in(chunk[start : start + count])
+                start += count
+
+    def finish(self) -> Future:
+        """Mark the end of the current playback.
+
+        Returns:
+            Future: Completed when the last written sample has been played.
+        """
+        future: Future = Future()
+        with self._write_lock:
+            self._playing = False
+            if self._read >= self._written:
+                future.set_result(None)
+            else:
+                self._pending.append((self._written, future))
+        return future
+
+    def close(self) -> None:
+        """Stop the stream and complete the pending playbacks."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        while self._pending:
+            self._pending.popleft()[1].cancel()
+        logger.debug(f"Player closed: {self.stats}")
+
+    def _open(self) -> None:
+        """Open and start the output stream if it is not running."""
+        if self._stream is not None:
+            return
+        backend = self.backend or get_backend()
+        stream = backend.open_output(
+            self.sample_rate, self.block_size, self.latency_setting, self._callback
+        )
+        stream.start()
+        self._stream = stream
+        logger.debug(f"Output stream opened, latency {stream.latency:.4f}s")
+
+    def _copy_in(self, samples: np.ndarray) -> None:
+        """Copy samples into the ring buffer after the written ones.
+
+        Args:
+            samples (np.ndarray): samples fitting in the free space.
+        """
+        capacity = len(self._buffer)
+        position = self._written % capacity
+        first = min(len(samples), capacity - position)
+        self._buffer[position : position + first] = samples[:first]
+        self._buffer[: len(samples) - first] = samples[first:]
+        self._written += len(samples)
+
+    def _callback(self, outdata: np.ndarray, frames: int, time, status) -> None:
+        """Fill the device buffer from the ring buffer.
+
+        Args:
+            outdata (np.ndarray): Device buffer of shape (frames, 1).
+            frames (int): Number of frames to provide.
+            time (Any): Timing information of the stream.
+            status (sd.CallbackFlags): Over- and underflow flags.
+        """
+        if status.output_underflow:
+            self.underruns += 1
+        capacity = len(self._buffer)
+        available = min(frames, self._written - self._read)
+        position = self._read % capacity
+        first = min(available, capacity - position)
+        outdata[:first, 0] = self._buffer[position : position + first]
+        outdata[first:available, 0] = self._buffer[: available - first]
+        outdata[available:, 0] = 0
+        if available < frames and self._playing:
+            # The producer did not keep up with the device.
+            self.underruns += 1
+        self._read += available
+        self._space.set()
+
+        while self._pending and self._pending[0][0] <= self._read:
+            self._pending.popleft()[1].set_result(None)
@@ -1,7 +1,39 @@
 """Hold common functions used in TTS."""
 
+from concurrent.futures import Future
+
 import numpy as np
-import sounddevice as sd
+
+from vocalizer.player import StreamPlayer
+
+_players: dict[int, StreamPlayer] = {}
+
+
+def get_player(fs: int) -> StreamPlayer:
+    """Get the persistent player of a sample rate.
+
+    Args:
+        fs (int): sample per second.
+
+    Returns:
+        StreamPlayer: The player, created on first use.
+    """
+    if fs not in _players:
+        _players[fs] = StreamPlayer(sample_rate=fs)
+    return _players[fs]
+
+
+def play_sound_async(wave: np.ndarray, fs: int = 44100) -> Future:
+    """Start playing an array and return without waiting for the end.
+
+    Args:
+        wave (np.ndarray): 1D input array representing a sound.
+        fs (int): sample per second. Defaults to 44100.
+
+    Returns:
+        Future: Completed when the sound has been played.
+    """
+    return get_player(fs).play(wave)
 
 
 def play_sound(wave: np.ndarray, fs: int = 44100) -> None:
@@ -11,5 +43,11 @@ def play_sound(wave: np.ndarray, fs: int = 44100) -> None:
         wave (np.ndarray): 1D input array representing a sound.
         fs (int): sample per second. Defaults to 44100.
     """
-    sd.play(wave, fs)
-    sd.wait()
+    play_sound_async(wave, fs).result()
+
+
+def close_players() -> None:
+    """Close the output streams of every player."""
+    while _players:
+        _, player = _players.popitem()
+        player.close()
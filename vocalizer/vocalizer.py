@@ -1,18 +1,29 @@
 """Convert text to speech."""
 
+import contextlib
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
+from loguru import logger
 from scipy.io import wavfile
-from speechbrain.pretrained import HIFIGAN, Tacotron2
 
-from audio_processing.util import convert_to_specific_db_spl
+from audio_processing.util import (
+    convert_to_specific_db_spl,
+    crossfade_concat,
+    trim_silence,
+)
+from backends import Lazy
+from vocalizer.corpus import read_header
 
 
 class Vocalizer(ABC):
     """Interface for the TTS system."""
 
+    # Sample rate of the generated waveforms.
+    sample_rate: int
+
     @abstractmethod
     def get_sound(self, text: str) -> np.ndarray:
         """Get a text and generate the corresponding sound with level of 65 dB SPL.
@@ -24,18 +35,95 @@ class Vocalizer(ABC):
             np.ndarray: waveform in shape of (1,length_of_wave)
         """
 
+    @property
+    def sources(self) -> list[Path]:
+        """Files and directories the generated waveforms depend on.
+
+        Returns:
+            list[Path]: Paths used to detect changes of the generated sound.
+        """
+        return []
+
+    @property
+    def settings(self) -> dict:
+        """Options that change the generated waveforms.
+
+        Returns:
+            dict: Options used, with the sources, to detect changes of the sound.
+        """
+        return {}
+
+    def warm_up(self) -> None:  # noqa: B027
+        """Prepare the models ahead of the first stimuli, if there are any."""
+
 
 class Recorded(Vocalizer):
-    """Class for generating waveform from recorded audio."""
+    """Class for generating waveform from recorded audio.
 
-    def __init__(self, src: Path) -> None:
+    The digit recordings are loaded once, so a trial only copies them into a
+    single output buffer, which is then scaled to 65 dB SPL as a whole.
+    """
+
+    def __init__(
+        self,
+        src: Path,
+        prepend_src: Optional[Path] = None,
+        digit_gap: float = 0.0,
+    ) -> None:
         """
         Initialize a new instance of the Vocalizer class.
 
         Args:
-            src (Path): The path to the recorded audio file.
+            src (Path): The path to the directory of recorded digits.
+            prepend_src (Optional[Path]): Recording played before the digits.
+                Defaults to None.
+            digit_gap (float): Silence between the recordings in seconds.
+                Defaults to 0.0.
+
+        Raises:
+            FileNotFoundError: If there is no recording in the directory.
+            ValueError: If the recordings do not share one sample rate.
         """
         self.src = src
+        self.prepend_src = prepend_src
+        self._recordings: dict[str, np.ndarray] = {}
+        sample_rates: dict[str, int] = {}
+        for path in sorted(Path(src).glob("*.wav")):
+            sample_rates[path.name], self._recordings[path.stem] = self._load(path)
+        if not self._recordings:
+            raise FileNotFoundError(f"No recording found in {src}")
+
+        self._prepend: Optional[np.ndarray] = None
+        if prepend_src is not None:
+            sample_rates[Path(prepend_src).name], self._prepend = self._load(
+                Path(prepend_src)
+            )
+
+        if len(set(sample_rates.values())) > 1:
+            raise ValueError(f"Recordings have different sample rates: {sample_rates}")
+        self.sample_rate = next(iter(sample_rates.values()))
+        self._gap = int(round(digit_gap * self.sample_rate))
+
+    @property
+    def sources(self) -> list[Path]:
+        """Files and directories the generated waveforms depend on.
+
+        Returns:
+            list[Path]: Directory of the recorded digits and the prepended file.
+        """
+        if self.prepend_src is not None:
+            return [Path(self.src), Path(self.prepend_src)]
+        return [Path(self.src)]
+
+    @property
+    def settings(self) -> dict:
+        """Options that change the generated waveforms.
+
+        Returns:
+            dict: Gap between the recordings in samples, and what is scaled to
+                65 dB SPL.
+        """
+        return {"gap": self._gap, "level": "trial"}
 
     def get_sound(self, text: str) -> np.ndarray:
         """Use the recorded audio to generate the waveform.
@@ -46,13 +134,30 @@ class Recorded(Vocalizer):
         Returns:
             np.ndarray: Audio signal.
         """
-        digits = self._extract_numbers(text)
-        full_audio = np.array([])
-        for digit in digits:
-            _, digit_audio = wavfile.read(self.src / f"{digit}.wav")
-            full_audio = np.concatenate((full_audio, digit_audio))
-        full_audio = convert_to_specific_db_spl(full_audio, 65)
-        return full_audio
+        segments = [self._recordings[digit] for digit in self._extract_numbers(text)]
+        if self._prepend is not None:
+            segments.insert(0, self._prepend)
+
+        total = sum(len(segment) for segment in segments)
+        full_audio = np.zeros(total + self._gap * (len(segments) - 1), np.float32)
+        start = 0
+        for segment in segments:
+            full_audio[start : start + len(segment)] = segment
+            start += len(segment) + self._gap
+        # The level includes the gaps, so the trial is at 65 dB SPL as played.
+        return convert_to_specific_db_spl(full_audio, 65, inplace=True)
+
+    def _load(self, path: Path) -> tuple[int, np.ndarray]:
+        """Read a recording as float32.
+
+        Args:
+            path (Path): Location of the wave file.
+
+        Returns:
+            tuple[int, np.ndarray]: Sample rate and float32 audio signal.
+        """
+        sample_rate, audio = wavfile.read(path)
+        return sample_rate, audio.astype(np.float32)
 
     def _extract_numbers(self, text: str) -> list[str]:
         """Extract the numbers from the stimuli.
@@ -67,29 +172,262 @@ class Recorded(Vocalizer):
         return split_text[-3:]
 
 
+class Prerendered(Vocalizer):
+    """Class for serving waveforms from a memory-mapped pre-rendered corpus.
+
+    The corpus is written by prerender.py. Waveforms are returned as views of the
+    mapped file, so no model is loaded and processes reading the same corpus share
+    its pages.
+    """
+
+    def __init__(self, src: Path) -> None:
+        """Map the corpus file and read its index.
+
+        Args:
+            src (Path): The path to the corpus file.
+        """
+        self.src = src
+        header, data_offset = read_header(src)
+        self.sample_rate = header["sample_rate"]
+        self._scale = header["scale"]
+        self._index: dict[str, tuple[int, int]] = {
+            text: (offset, length) for text, (offset, length) in header["index"].items()
+        }
+        self._triplets = {
+            self._triplet_id(text): location for text, location in self._index.items()
+        }
+        dtype = "<f4" if header["dtype"] == "float32" else "<i2"
+        self._samples = np.memmap(src, dtype=dtype, mode="r", offset=data_offset)
+
+    @property
+    def sources(self) -> list[Path]:
+        """Files and directories the generated waveforms depend on.
+
+        Returns:
+            list[Path]: The corpus file.
+        """
+        return [Path(self.src)]
+
+    def get_sound(self, text: str) -> np.ndarray:
+        """Get the pre-rendered waveform of the stimuli.
+
+        The stimuli is looked up by its text, or by its triplet ID (the last three
+        words) if the exact text is not in the corpus.
+
+        Args:
+            text (str): The generated stimuli as an string.
+
+        Raises:
+            KeyError: If the stimuli is not in the corpus.
+
+        Returns:
+            np.ndarray: Read-only view of the waveform for float32 corpora,
+                a scaled float32 copy for int16 corpora.
+        """
+        location = self._index.get(text) or self._triplets.get(self._triplet_id(text))
+        if location is None:
+            raise KeyError(f"Stimuli '{text}' is not in the corpus {self.src}")
+        offset, length = location
+        sound = self._samples[offset : offset + length]
+        if sound.dtype != np.float32:
+            return sound.astype(np.float32) * np.float32(self._scale)
+        return sound
+
+    def _triplet_id(self, text: str) -> str:
+        """Get the ID of a stimuli from its three digits.
+
+        Args:
+            text (str): The stimuli as an string.
+
+        Returns:
+            str: The digits joined with hyphens, e.g. one-two-three.
+        """
+        return "-".join(text.lower().split(" ")[-3:])
+
+
 class TTS(Vocalizer):
     """Class for generating waveform from string.
 
     From Hugging Face repo: https://huggingface.co/speechbrain/tts-hifigan-ljspeech
     """
 
-    def __init__(self, device: str = "cpu") -> None:
-        """Initialize the class and load  tacotron2 and hifi_gan.
+    sample_rate = 22050
+    hop_length = 256
+    modes = ("full", "segmental")
+
+    # Synthesized segments shared by every instance using the same checkpoints.
+    _segments: dict[tuple[str, str, bool], dict[str, np.ndarray]] = {}
+
+    def __init__(
+        self,
+        device: str = "cpu",
+        mode: str = "full",
+        crossfade: float = 0.01,
+        fast_inference: bool = False,
+        threads: Optional[int] = None,
+        interop_threads: Optional[int] = None,
+    ) -> None:
+        """Initialize the class, tacotron2 and hifi_gan are loaded on first use.
+
+        In "full" mode every stimuli is synthesized as one sentence. In "segmental"
+        mode the carrier phrase and each digit are synthesized once and the
+        stimuli is spliced from these segments.
+
+        With fast_inference, the models run under torch.inference_mode, the linear
+        and LSTM layers of Tacotron2 are quantized to int8, HiFi-GAN is traced with
+        TorchScript and both models are warmed up once after loading.
 
         Args:
             device (str): device to run the operations on
                 (cpu,cuda,mps). Defaults to "cpu".
+            mode (str): synthesis mode (full, segmental). Defaults to "full".
+            crossfade (float): Overlap between spliced segments in seconds.
+                Defaults to 0.01.
+            fast_inference (bool): Optimize the models for CPU inference.
+                Defaults to False.
+            threads (Optional[int]): Number of intra-op threads of torch.
+                Defaults to None, torch's default.
+            interop_threads (Optional[int]): Number of inter-op threads of torch.
+                Defaults to None, torch's default.
+
+        Raises:
+            ValueError: If the mode is not supported.
+        """
+        if mode not in self.modes:
+            raise ValueError(f"Unsupported TTS mode {mode}, use {self.modes}")
+        self.mode = mode
+        self.crossfade = int(round(crossfade * self.sample_rate))
+        self.fast_inference = fast_inference
+        self.threads = threads
+        self.interop_threads = interop_threads
+
+        self.device = device
+        self.tts_dir = Path("models/tmpdir_tts")
+        self.vocoder_dir = Path("models/tmpdir_vocoder")
+        self._models = Lazy(self._load)
+
+    @property
+    def tacotron2(self):
+        """The Tacotron2 acoustic model, loaded on first use.
+
+        Returns:
+            Tacotron2: The acoustic model.
         """
-        self.tacotron2 = Tacotron2.from_hparams(
+        return self._models.get()[0]
+
+    @property
+    def hifi_gan(self):
+        """The HiFi-GAN vocoder, loaded on first use.
+
+        Returns:
+            HIFIGAN: The vocoder.
+        """
+        return self._models.get()[1]
+
+    def warm_up(self) -> None:
+        """Load tacotron2 and hifi_gan in a background thread."""
+        self._models.warm_up()
+
+    def _load(self) -> tuple:
+        """Load tacotron2 and hifi_gan.
+
+        Returns:
+            tuple: The Tacotron2 and HIFIGAN models.
+        """
+        import torch
+        from speechbrain.pretrained import HIFIGAN, Tacotron2
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as exc:
+                logger.warning(f"Could not set the inter-op threads: {exc}")
+
+        tacotron2 = Tacotron2.from_hparams(
             source="speechbrain/tts-tacotron2-ljspeech",
-            savedir="models/tmpdir_tts",
-            run_opts={"device": device},
+            savedir=str(self.tts_dir),
+            run_opts={"device": self.device},
         )
-        self.hifi_gan = HIFIGAN.from_hparams(
+        hifi_gan = HIFIGAN.from_hparams(
             source="speechbrain/tts-hifigan-ljspeech",
-            savedir="models/tmpdir_vocoder",
-            run_opts={"device": device},
+            savedir=str(self.vocoder_dir),
+            run_opts={"device": self.device},
         )
+        if self.fast_inference:
+            self._optimize(tacotron2, hifi_gan)
+        return tacotron2, hifi_gan
+
+    def _optimize(self, tacotron2, hifi_gan) -> None:
+        """Quantize Tacotron2, trace HiFi-GAN and warm both models up.
+
+        Tacotron2 decodes autoregressively with a data dependent stop, so it is
+        quantized rather than traced. HiFi-GAN is fully convolutional and traces
+        to a graph that accepts any spectrogram length.
+
+        Args:
+            tacotron2 (Tacotron2): The acoustic model.
+            hifi_gan (HIFIGAN): The vocoder.
+        """
+        import torch
+
+        torch.ao.quantization.quantize_dynamic(
+            tacotron2.mods.model,
+            {torch.nn.Linear, torch.nn.LSTM, torch.nn.LSTMCell},
+            dtype=torch.qint8,
+            inplace=True,
+        )
+
+        with torch.no_grad():
+            mel_output, _, _ = tacotron2.encode_text("The number is one two three ")
+            # The first call removes the weight normalization of the generator.
+            hifi_gan.decode_batch(mel_output)
+            try:
+                traced = torch.jit.trace_module(
+                    hifi_gan.hparams.generator, {"inference": mel_output}
+                )
+                hifi_gan.infer = traced.inference
+            except Exception as exc:
+                logger.warning(f"Could not trace HiFi-GAN, using eager mode: {exc}")
+
+        with torch.inference_mode():
+            mel_output, _, _ = tacotron2.encode_text("The number is one two three ")
+            hifi_gan.decode_batch(mel_output)
+
+    def _inference_context(self):
+        """Get the context the models run in.
+
+        Returns:
+            ContextManager: torch.inference_mode with fast inference, else a no-op.
+        """
+        if not self.fast_inference:
+            return contextlib.nullcontext()
+        import torch
+
+        return torch.inference_mode()
+
+    @property
+    def sources(self) -> list[Path]:
+        """Files and directories the generated waveforms depend on.
+
+        Returns:
+            list[Path]: Checkpoint directories of Tacotron2 and HiFi-GAN.
+        """
+        return [self.tts_dir, self.vocoder_dir]
+
+    @property
+    def settings(self) -> dict:
+        """Options that change the generated waveforms.
+
+        Returns:
+            dict: Synthesis mode, crossfade length and optimization of the models.
+        """
+        return {
+            "mode": self.mode,
+            "crossfade": self.crossfade,
+            "fast_inference": self.fast_inference,
+        }
 
     def get_sound(self, text: str) -> np.ndarray:
         """Get a text and generate the corresponding sound with level of 65 dB SPL.
@@ -100,10 +438,77 @@ class TTS(Vocalizer):
         Returns:
             np.ndarray: waveform in shape of (1,length_of_wave)
         """
-        mel_output, mel_length, alignment = self.tacotron2.encode_text(text + " ")
+        if self.mode == "segmental":
+            return self._get_spliced_sound(text)
 
-        # Running Vocoder (spectrogram-to-waveform)
-        waveforms = self.hifi_gan.decode_batch(mel_output)
+        with self._inference_context():
+            mel_output, mel_length, alignment = self.tacotron2.encode_text(text + " ")
+
+            # Running Vocoder (spectrogram-to-waveform)
+            waveforms = self.hifi_gan.decode_batch(mel_output)
         sound = waveforms.to("cpu").squeeze(1).numpy()
         sound = convert_to_specific_db_spl(sound, 65)
         return sound.squeeze(0)
+
+    def get_sounds(self, texts: list[str]) -> list[np.ndarray]:
+        """Generate the sound of several texts with one batched pass of the models.
+
+        Tacotron2 requires the batch to be sorted by decreasing input length, so the
+        texts are sorted before synthesis and the results are returned in the
+        original order. Each waveform is trimmed to its own mel length and scaled
+        to 65 dB SPL.
+
+        Args:
+            texts (list[str]): input strings
+
+        Returns:
+            list[np.ndarray]: 1D waveform of each text.
+        """
+        inputs = [text + " " for text in texts]
+        order = sorted(
+            range(len(inputs)),
+            key=lambda i: self.tacotron2.text_to_seq(inputs[i])[1],
+            reverse=True,
+        )
+        with self._inference_context():
+            mel_output, mel_lengths, alignments = self.tacotron2.encode_batch(
+                [inputs[i] for i in order]
+            )
+            waveforms = self.hifi_gan.decode_batch(mel_output).to("cpu").squeeze(1)
+
+        sounds: list[np.ndarray] = [np.array([])] * len(texts)
+        for position, index in enumerate(order):
+            length = int(mel_lengths[position]) * self.hop_length
+            sound = waveforms[position, :length].numpy()
+            sounds[index] = convert_to_specific_db_spl(sound, 65)
+        return sounds
+
+    def _get_spliced_sound(self, text: str) -> np.ndarray:
+        """Build the sound of a stimuli from cached carrier and digit segments.
+
+        The carrier phrase (every word but the last three) and each digit are
+        synthesized on their first use, trimmed and kept for the whole process.
+
+        Args:
+            text (str): input string
+
+        Returns:
+            np.ndarray: 1D waveform with level of 65 dB SPL.
+        """
+        words = text.split(" ")
+        parts = [" ".join(words[:-3])] + words[-3:] if len(words) > 3 else words
+        parts = [part for part in parts if part]
+
+        key = (
+            str(self.tts_dir.resolve()),
+            str(self.vocoder_dir.resolve()),
+            self.fast_inference,
+        )
+        segments = self._segments.setdefault(key, {})
+        missing = sorted({part for part in parts if part not in segments})
+        if missing:
+            for part, sound in zip(missing, self.get_sounds(missing)):
+                segments[part] = trim_silence(sound).astype(np.float32)
+
+        sound = crossfade_concat([segments[part] for part in parts], self.crossfade)
+        return convert_to_specific_db_spl(sound, 65).astype(np.float32)